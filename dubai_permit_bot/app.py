@@ -1,34 +1,110 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import atexit
 import pymongo
-from pymongo import MongoClient
-from datetime import datetime, date
-import json
+from bson import ObjectId
+from collections import deque
+from dataclasses import fields, replace
+from datetime import datetime, date, timedelta, timezone
+import gc
 import logging
+import logging.handlers
 import traceback
 import os
+import queue
 from functools import wraps
-from typing import Optional, Dict, Any, Union
+from typing import Optional, Dict, Any
 import sys
+import threading
+import textwrap
+import time
+
+from datastore import get_collection, queue_insert
+from models import ChatEntry, EventData
 
 # ========================= LOGGING CONFIGURATION =========================
 
+class BufferedFileHandler(logging.FileHandler):
+    """
+    FileHandler that writes through a 64 KB buffer and flushes on an interval
+    instead of per record; ERROR and above are flushed at once so they are
+    on disk even if the process dies before the next interval.
+    """
+    
+    def __init__(self, filename: str, encoding: Optional[str] = None,
+                 buffer_size: int = 65536, flush_interval: float = 0.5):
+        self.buffer_size = buffer_size
+        super().__init__(filename, encoding=encoding)
+        self._closing = threading.Event()
+        threading.Thread(
+            target=self._flush_periodically, args=(flush_interval,),
+            name=f"log-flush-{os.path.basename(filename)}", daemon=True
+        ).start()
+    
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=self.buffer_size,
+                    encoding=self.encoding, errors=self.errors)
+    
+    def emit(self, record: logging.LogRecord):
+        # Same as StreamHandler.emit minus the per-record flush for routine levels
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+            if record.levelno >= logging.ERROR:
+                self.stream.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+    
+    def _flush_periodically(self, interval: float):
+        # flush() takes the handler lock, so this cannot interleave with emit()
+        while not self._closing.wait(interval):
+            self.flush()
+    
+    def close(self):
+        self._closing.set()
+        super().close()
+
+class SessionDebugFilter(logging.Filter):
+    """Pass DEBUG records only from script runs whose session has debug mode on"""
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        # Background threads (MongoDB writer, log flushers) have no session to ask
+        if get_script_run_ctx(suppress_warning=True) is None:
+            return False
+        return bool(st.session_state.get('debug_mode', False))
+
 def setup_logging():
-    """Configure logging for the application"""
+    """
+    Configure logging once per process. The logger only enqueues records;
+    a background QueueListener does the file and console writes.
+    """
+    log_format = '%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s'
+    logger = logging.getLogger('dubai_event_app')
+    
+    # Streamlit re-executes this script on every rerun, but the logger and its
+    # listener live for the whole process, so only configure them the first time
+    if any(isinstance(handler, logging.handlers.QueueHandler) for handler in logger.handlers):
+        return logger
+    
     try:
         if not os.path.exists('logs'):
             os.makedirs('logs')
         
-        log_format = '%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s'
-        
-        logger = logging.getLogger('dubai_event_app')
+        # The level stays fixed for the process; SessionDebugFilter decides per
+        # session whether DEBUG records are kept, so one session's sidebar toggle
+        # never changes what other sessions log
         logger.setLevel(logging.DEBUG)
-        logger.handlers.clear()
         
-        file_handler = logging.FileHandler('logs/dubai_event_app.log', encoding='utf-8')
+        file_handler = BufferedFileHandler('logs/dubai_event_app.log', encoding='utf-8')
         file_handler.setLevel(logging.DEBUG)
         file_handler.setFormatter(logging.Formatter(log_format))
         
-        error_handler = logging.FileHandler('logs/errors.log', encoding='utf-8')
+        error_handler = BufferedFileHandler('logs/errors.log', encoding='utf-8')
         error_handler.setLevel(logging.ERROR)
         error_handler.setFormatter(logging.Formatter(log_format))
         
@@ -36,9 +112,19 @@ def setup_logging():
         console_handler.setLevel(logging.INFO)
         console_handler.setFormatter(logging.Formatter('%(levelname)s - %(message)s'))
         
-        logger.addHandler(file_handler)
-        logger.addHandler(error_handler)
-        logger.addHandler(console_handler)
+        log_queue = queue.Queue(-1)
+        listener = logging.handlers.QueueListener(
+            log_queue, file_handler, error_handler, console_handler,
+            respect_handler_level=True
+        )
+        
+        logger.handlers.clear()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.addFilter(SessionDebugFilter())
+        logger.addHandler(queue_handler)
+        listener.start()
+        # Stopping the listener drains the queue and flushes the file handlers
+        atexit.register(listener.stop)
         
         return logger
     except Exception as e:
@@ -49,20 +135,31 @@ def setup_logging():
 
 logger = setup_logging()
 
+# Move the long-lived import-time objects (Streamlit, pymongo, this module's
+# tables) out of the collector's scans. Done once per process: freezing on
+# every rerun would also pin each run's garbage in the permanent generation.
+if gc.get_freeze_count() == 0:
+    gc.collect()
+    gc.freeze()
+
 # ========================= ERROR HANDLING DECORATORS =========================
 
 def handle_exceptions(func):
     """Decorator to handle exceptions gracefully"""
+    # Resolved once at decoration time instead of on every call
+    name = func.__name__
+    debug = logger.debug
+
     @wraps(func)
     def wrapper(*args, **kwargs):
         try:
-            logger.debug(f"Executing function: {func.__name__}")
+            debug("Executing function: %s", name)
             result = func(*args, **kwargs)
-            logger.debug(f"Function {func.__name__} completed successfully")
+            debug("Function %s completed successfully", name)
             return result
         except Exception as e:
-            logger.error(f"Error in function {func.__name__}: {str(e)}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            # exc_info lets logging format the traceback once and reuse it for every handler
+            logger.error(f"Error in function {name}: {str(e)}", exc_info=True)
             st.error(f"An error occurred: {str(e)}")
             if st.session_state.get('debug_mode', False):
                 st.error(f"Debug Info: {traceback.format_exc()}")
@@ -72,86 +169,68 @@ def handle_exceptions(func):
 def safe_execute(func, *args, **kwargs):
     """Safe execution wrapper for critical operations"""
     try:
-        logger.debug(f"Safe executing: {func.__name__ if hasattr(func, '__name__') else str(func)}")
+        logger.debug("Safe executing: %s", getattr(func, '__name__', func))
         return func(*args, **kwargs)
     except Exception as e:
-        logger.error(f"Safe execution failed: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.error(f"Safe execution failed: {str(e)}", exc_info=True)
         return None
 
-# ========================= DATABASE CONNECTION =========================
+# ========================= DATA MODELS =========================
 
-@st.cache_resource
-@handle_exceptions
-def init_connection():
-    """Initialize MongoDB connection with enhanced error handling"""
-    try:
-        logger.info("Initializing MongoDB connection")
-        connection_string = os.getenv('MONGODB_URI', "dummy_url")
-        
-        if not connection_string:
-            logger.error("MongoDB connection string is not set")
-            st.error("Database connection string is not configured. Please check your environment variables.")
-            return None
+# Sidebar labels for each EventData field
+_FIELD_LABELS = {f.name: f.name.replace('_', ' ').title() for f in fields(EventData)}
 
-        logger.debug(f"Using connection string: {connection_string[:20]}...")
-        
-        client = pymongo.MongoClient(
-            connection_string,
-            serverSelectionTimeoutMS=5000,
-            connectTimeoutMS=5000,
-            maxPoolSize=10
-        )
-        
-        client.admin.command('ping')
-        logger.info("MongoDB connection successful")
-        
-        db = client["Chatbot"]
-        collection = db["event_data"]
-        
-        logger.info(f"Connected to database: {db.name}")
-        logger.info(f"Using collection: {collection.name}")
-        
-        return collection
-        
-    except pymongo.errors.ServerSelectionTimeoutError as e:
-        logger.error(f"MongoDB connection timeout: {e}")
-        st.error("Database connection timeout. Please check if MongoDB is running.")
-        return None
-    except pymongo.errors.ConnectionFailure as e:
-        logger.error(f"MongoDB connection failed: {e}")
-        st.error("Failed to connect to database. Please check your connection settings.")
-        return None
-    except Exception as e:
-        logger.error(f"Unexpected database error: {e}")
-        st.error(f"Database connection failed: {e}")
-        return None
+# Sidebar value formatter per field; the schema is fixed, so no per-value type checks
+_COUNT_FORMAT = "{:,}".format
+_FIELD_FORMATTERS = {
+    'event_types': lambda types: ", ".join(types) or "None",
+    'no_of_participants': _COUNT_FORMAT,
+    'no_of_performers': _COUNT_FORMAT,
+    'no_of_speakers': _COUNT_FORMAT,
+}
 
 # ========================= SESSION STATE MANAGEMENT =========================
 
+# Oldest messages are dropped beyond this so per-session memory and the
+# per-rerun render loop stay bounded in long conversations
+MAX_CHAT_HISTORY = 200
+
+def new_chat_history() -> deque:
+    """Empty chat history ring buffer"""
+    return deque(maxlen=MAX_CHAT_HISTORY)
+
+# Immutable defaults are shared; mutable ones are built by their factory only when missing
+_SESSION_DEFAULTS = (
+    ('conversation_step', 'greeting'),
+    ('show_greeting', True),
+    ('last_fee', None),
+    ('debug_mode', False),
+    ('error_count', 0),
+    ('last_error', None)
+)
+_SESSION_FACTORIES = (
+    ('event_data', EventData),
+    ('chat_history', new_chat_history)
+)
+
+# Keys dropped by "Clear Current Event"; init_session_state re-seeds them on the rerun
+_CONVERSATION_KEYS = ('event_data', 'last_fee', 'conversation_step', 'chat_history', 'show_greeting')
+
 @handle_exceptions
 def init_session_state():
     """Initialize session state with error handling"""
     logger.debug("Initializing session state")
     
-    default_values = {
-        'conversation_step': 'greeting',
-        'event_data': {},
-        'chat_history': [],
-        'show_greeting': True,
-        'debug_mode': False,
-        'error_count': 0,
-        'last_error': None
-    }
-    
-    for key, value in default_values.items():
-        if key not in st.session_state:
-            st.session_state[key] = value
-            logger.debug(f"Initialized session state: {key} = {value}")
+    session = st.session_state
+    for key, value in _SESSION_DEFAULTS:
+        session.setdefault(key, value)
+    for key, factory in _SESSION_FACTORIES:
+        if key not in session:
+            session[key] = factory()
 
 # ========================= CONSTANTS =========================
 
-TICKETED_EVENT_TYPES = [
+TICKETED_EVENT_TYPES = (
     "Exhibition",
     "Conference",
     "Conference + Exhibition", 
@@ -163,9 +242,9 @@ TICKETED_EVENT_TYPES = [
     "DJ Event",
     "Musical Event",
     "Comedy Show"
-]
+)
 
-NON_TICKETED_EVENT_TYPES = [
+NON_TICKETED_EVENT_TYPES = (
     "Exhibition",
     "Conference/Forum/Meeting/Summit",
     "Conference + Exhibition",
@@ -176,14 +255,14 @@ NON_TICKETED_EVENT_TYPES = [
     "DJ Event",
     "Musical Event",
     "Comedy Show"
-]
+)
 
-DUBAI_VENUES = [
+DUBAI_VENUES = (
     "Hotel",
     "Other"
-]
+)
 
-INDUSTRIES = [
+INDUSTRIES = (
     "IT & Technology",
     "Healthcare",
     "Finance & Banking",
@@ -195,10 +274,351 @@ INDUSTRIES = [
     "Fashion & Beauty",
     "Food & Beverage",
     "Other"
-]
+)
+
+# Selectbox options including their placeholder entry
+_VENUE_PLACEHOLDER = "Select a venue..."
+_INDUSTRY_PLACEHOLDER = "Select industry..."
+VENUE_CHOICES = (_VENUE_PLACEHOLDER, *DUBAI_VENUES)
+INDUSTRY_CHOICES = (_INDUSTRY_PLACEHOLDER, *INDUSTRIES)
+
+# Ticketing types that use the ticketed event list and tariff
+_TICKETED_TYPES = frozenset(('paid_ticketed', 'free_ticketed'))
+
+# ========================= PAGE STYLING =========================
+
+_CSS = """
+<style>
+    .stButton>button {
+        width: 100%;
+        padding: 0.5rem;
+        border-radius: 8px;
+        font-weight: bold;
+    }
+    .stChatMessage {
+        padding: 1rem;
+        border-radius: 10px;
+        margin-bottom: 1rem;
+    }
+    .stTextInput>div>div>input, .stTextArea>div>div>textarea {
+        border-radius: 8px;
+    }
+    .stSelectbox>div>div>div {
+        border-radius: 8px;
+    }
+    .debug-info {
+        background-color: #f0f0f0;
+        padding: 10px;
+        border-radius: 5px;
+        margin: 10px 0;
+    }
+</style>
+"""
+
+_HEADER_HTML = """
+<div style="text-align: center; padding: 2rem 0; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); border-radius: 10px; margin-bottom: 2rem;">
+    <h1 style="color: white; margin: 0; font-size: 2.5rem;">🎪 Dubai Event Permit Business Support Assistant</h1>
+    <p style="color: white; margin: 0.5rem 0 0 0; font-size: 1.2rem;">Your AI-powered guide for Dubai event permits and fee calculations</p>
+</div>
+"""
+
+# Styles and header go out as one element (must be emitted on every run;
+# Streamlit drops elements a rerun does not re-emit)
+_PAGE_CHROME = _CSS + _HEADER_HTML
+
+# ========================= MESSAGE TEMPLATES =========================
+
+_GREETING_MSG = """
+Hello! 👋 Welcome to Dubai Event Permit Business Support Assistant.
+I'm here to help you with:
+
+✅ Event permit applications in Dubai \n
+✅ **Government fee calculations and estimates** \n
+✅ Document requirements and checklists \n 
+✅ Application timeline planning \n
+✅ Regulatory compliance guidance \n
+
+Let's get your event permit sorted efficiently! How can I assist you today?
+"""
+
+_CLASSIFICATION_MSG = """
+Perfect! I'll guide you through the government fee calculation process.\n
+**Step 1: Event Classification**
+
+Is your event:\n
+
+🏢 **INTERNAL** - Company/organizational event for employees only \n
+🌍 **EXTERNAL** - Event with external guests, clients, or public attendance \n
+
+This determines your permit category and fee structure.
+"""
+
+_INTERNAL_MSG = """
+**INTERNAL EVENT IDENTIFIED** 🏢
+Good news! For internal company events:
+- Your venue handles the permit application
+- Simplified documentation required
+- Lower government fees typically apply
+- Faster processing times
+**What I can help you with:**
+- Calculate estimated fees for budgeting
+- Prepare information for your venue
+- Ensure compliance requirements are met
+Let's proceed with fee calculation! I'll need some basic event details.
+"""
+
+_TICKETING_MSG = """
+**EXTERNAL EVENT IDENTIFIED** 🌍
+For external events, I need to understand your ticketing structure: \n
+💰 **PAID TICKETED** - Admission fees, ticket sales, revenue generation \n
+🎫 **FREE TICKETED** - No charge but controlled access with registration/badges  \n
+🆓 **NON-TICKETED** - No charge, no registration, open to public \n
+This classification significantly impacts your permits and fees.
+"""
+
+_REQUIREMENTS_MSG = """
+**📋 DOCUMENT REQUIREMENTS CHECKER**
+
+For Dubai event permits, you'll typically need:
+
+**For All Events:**\n
+✅ Completed application form \n
+✅ Company trade license copy \n
+✅ Event concept/description  \n
+✅ Venue booking confirmation \n
+✅ Event layout/floor plan    \n
+
+**For External Events:**\n
+✅ Marketing materials/brochures \n
+✅ Speaker/performer details \n
+✅ Security plan (for large events) \n
+✅ Insurance certificate \n
+
+**For Paid Events:**\n
+✅ Ticketing system details   \n
+✅ Revenue projections        \n
+✅ Payment processing setup   \n
+
+Would you like me to help calculate your fees as well?
+"""
+
+_SPECIALIST_MSG = """
+**📞 SPECIALIST CONSULTATION**
+
+Our permit specialists can help with:
+- Complex event scenarios
+- Multi-venue events
+- International performer permits
+- Expedited processing
+- Compliance reviews
+
+**Contact Information:**
+📧 Email: permits@dubaievents.gov.ae \n
+📱 Phone: +971-4-XXX-XXXX \n
+🕐 Hours: Sunday-Thursday, 8:00 AM - 3:00 PM \n
+
+In the meantime, I can help you get started with fee calculations!
+"""
+
+_GENERAL_MSG = """
+**❓ GENERAL PERMIT INFORMATION**
+
+**Common Questions:**
+
+**Q: How long does permit processing take?** \n
+A: 5-15 working days depending on event complexity
+
+**Q: Can I apply for multiple events at once?** \n
+A: Yes, but each event needs a separate application
+
+**Q: What if my event details change?** \n
+A: You must notify authorities within 48 hours of changes
+
+**Q: Are there restrictions on event timing?**\n
+A: Yes, some venues have restrictions during Ramadan and national holidays
+
+For more specific questions, please refer to this [Dubai Events FAQ](https://epermits.det.gov.ae/ePermit/FAQDocumentEN.html) or contact our support team.\n
+
+Let me help you calculate your specific event fees!
+"""
+
+_FEE_ESTIMATE_TEMPLATE = """
+**💰 ESTIMATED GOVERNMENT FEES**
+
+Event: **{event_name}**
+Classification: **{classification}**
+Participants: **{participants:,}**
+Duration: **{days} day(s)**
+
+**Estimated Total Fee: AED {total:,}**
+
+*This is an estimate. Final fees may vary based on additional requirements and government regulations.*
+"""
+
+_FEE_BREAKDOWN_TEMPLATE = """**DETAILED FEE BREAKDOWN**
+
+{components}
+
+**Total: AED {total:,}**{notes}"""
+
+# Bound formatters for fee amounts and breakdown lines
+_FMT_AED = "AED {:,}".format
+_FMT_FEE_LINE = "{}: AED {:,}".format
+
+# Display labels for the calculators' cost components
+_FEE_COMPONENT_LABELS = {
+    key: key.replace('_', ' ').title()
+    for key in ('base_fee', 'urgent_fee', 'amendment_fee', 'performer_fee', 'additional_days_fee')
+}
 
 # ========================= CALCULATION FUNCTIONS =========================
 
+# Amendment fee formula for venue-dependent events, keyed by normalized venue
+_VENUE_AMENDMENT_FORMULA = {
+    "hotel": "800+500+750+20",
+    "other": "800+500+350+20"
+}
+
+def _parse_amendment_formula(formula: str) -> tuple:
+    """
+    Split an amendment formula into (fixed_fee, performer_terms, day_terms).
+    Performer rate terms (750/350) and the 800 day term are charged at the
+    event's actual values, every other term is a flat fee.
+    """
+    fixed_fee = performer_terms = day_terms = 0
+    for part in formula.split('+'):
+        part = part.strip()
+        if part in ('750', '350'):
+            performer_terms += 1
+        elif part == '800':
+            day_terms += 1
+        elif part.isdigit():
+            fixed_fee += int(part)
+    return fixed_fee, performer_terms, day_terms
+
+# Parsed once here instead of on every amendment calculation
+_AMENDMENT_TERMS = {formula: _parse_amendment_formula(formula) for formula in _VENUE_AMENDMENT_FORMULA.values()}
+
+# Define the pricing structure with performer handling
+NON_TICKETED_PRICING_DATA = {
+    "Exhibition": {
+        "rate": 1270,
+        "urgent": 520,
+        "amendment": 0,
+        "performer_rate": 0,
+        "days_handling": "ANY",
+        "performer_handling": "0"  # No performers included in base rate
+    },
+    "conference/forum/meeting/summit": {
+        "rate": 520,
+        "urgent": 520,
+        "amendment": 0,
+        "performer_rate": 0,
+        "days_handling": "ANY",
+        "performer_handling": "0"
+    },
+    "Conference+ Exhibition": {
+        "rate": 1770,
+        "urgent": 520,
+        "amendment": 0,
+        "performer_rate": 0,
+        "days_handling": "ANY",
+        "performer_handling": "0"
+    },
+    "Exhibiton/product launch +Confrence/forum/seminar/Sumit": {
+        "rate": 1770,
+        "urgent": 520,
+        "amendment": 0,
+        "performer_rate": 0,
+        "days_handling": "ANY",
+        "performer_handling": "0"
+    },
+    "Award Cermony": {
+        "hotel_rate": 2270,  # Includes 1 performer
+        "other_rate": 1570,   # Includes 1 performer
+        "urgent": 500,
+        "amendment": _VENUE_AMENDMENT_FORMULA,
+        "performer_rate_hotel": 750,
+        "performer_rate_other": 350,
+        "days_handling": "1",
+        "performer_handling": "1"  # 1 performer included in base rate
+    },
+    "Award Cermony + Confrence": {
+        "hotel_rate": 2790,  # Includes 1 performer
+        "other_rate": 2090,   # Includes 1 performer
+        "urgent": 500,
+        "amendment": _VENUE_AMENDMENT_FORMULA,
+        "performer_rate_hotel": 750,
+        "performer_rate_other": 350,
+        "days_handling": "1",
+        "performer_handling": "1"
+    },
+    "Award Cermony+Confrence+Exhibition": {
+        "hotel_rate": 3820,  # Includes 1 performer
+        "other_rate": 3120,   # Includes 1 performer
+        "urgent": 500,
+        "amendment": _VENUE_AMENDMENT_FORMULA,
+        "performer_rate_hotel": 750,
+        "performer_rate_other": 350,
+        "days_handling": "1",
+        "performer_handling": "1"
+    },
+    "DJ event": {
+        "hotel_rate": 2270,  # Includes 1 performer
+        "other_rate": 1570,   # Includes 1 performer
+        "urgent": 500,
+        "amendment": _VENUE_AMENDMENT_FORMULA,
+        "performer_rate_hotel": 750,
+        "performer_rate_other": 350,
+        "days_handling": "1",
+        "performer_handling": "1"
+    },
+    "Musical event": {
+        "hotel_rate": 2270,  # Includes 1 performer
+        "other_rate": 1570,   # Includes 1 performer
+        "urgent": 500,
+        "amendment": _VENUE_AMENDMENT_FORMULA,
+        "performer_rate_hotel": 750,
+        "performer_rate_other": 350,
+        "days_handling": "1",
+        "performer_handling": "1"
+    },
+    "Comedy show": {
+        "hotel_rate": 2270,  # Includes 1 performer
+        "other_rate": 1570,   # Includes 1 performer
+        "urgent": 500,
+        "amendment": _VENUE_AMENDMENT_FORMULA,
+        "performer_rate_hotel": 750,
+        "performer_rate_other": 350,
+        "days_handling": "1",
+        "performer_handling": "1"
+    }
+}
+
+# Define the pricing structure from CSV with day handling info
+TICKETED_PRICING_DATA = {
+    "Exhibition": {"rate": 1270, "urgent": 500, "amendment": "NA", "days_handling": "ANY"},
+    "Conference": {"rate": 1270, "urgent": 500, "amendment": "NA", "days_handling": "ANY"},
+    "Conference + Exhibition": {"rate": 1770, "urgent": 500, "amendment": "NA", "days_handling": "ANY"},
+    "Product Launch/Forum/Seminar/Summit": {"rate": 1270, "urgent": 500, "amendment": "NA", "days_handling": "ANY"},
+    "Exhibition/Product Launch + Conference/Forum/Seminar/Summit": {"rate": 1770, "urgent": 500, "amendment": "NA", "days_handling": "ANY"},
+    "Award Ceremony": {"rate": 1520, "urgent": 500, "amendment": 1320, "days_handling": "1"},
+    "Award Ceremony + Conference": {"rate": 2570, "urgent": 500, "amendment": 1320, "days_handling": "1"},
+    "Award Ceremony + Conference + Exhibition": {"rate": 3070, "urgent": 500, "amendment": 1320, "days_handling": "1"},
+    "DJ Event": {"rate": 1520, "urgent": 500, "amendment": 1320, "days_handling": "1"},
+    "Musical Event": {"rate": 1520, "urgent": 500, "amendment": 1320, "days_handling": "1"},
+    "Comedy Show": {"rate": 1520, "urgent": 500, "amendment": 1320, "days_handling": "1"}
+}
+
+# Lookup indexes built once so event type matching avoids scanning the tables
+_NON_TICKETED_KEYS_LOWER = {key.lower(): key for key in NON_TICKETED_PRICING_DATA}
+_TICKETED_KEYS_LOWER = {key.lower(): key for key in TICKETED_PRICING_DATA}
+_TICKETED_KEYS_BY_LENGTH = sorted(
+    ((key.lower(), key) for key in TICKETED_PRICING_DATA),
+    key=lambda item: len(item[1]),
+    reverse=True
+)
+
 def calculate_non_ticketed_event_permit_cost(
     event_type: str,
     venue_type: str,
@@ -211,118 +631,14 @@ def calculate_non_ticketed_event_permit_cost(
     """
     Calculate the total permit cost for a non-ticketed event with improved performer handling.
     """
-    # Define the pricing structure with performer handling
-    pricing_data = {
-        "Exhibition": {
-            "rate": 1270,
-            "urgent": 520,
-            "amendment": 0,
-            "performer_rate": 0,
-            "days_handling": "ANY",
-            "performer_handling": "0"  # No performers included in base rate
-        },
-        "conference/forum/meeting/summit": {
-            "rate": 520,
-            "urgent": 520,
-            "amendment": 0,
-            "performer_rate": 0,
-            "days_handling": "ANY",
-            "performer_handling": "0"
-        },
-        "Conference+ Exhibition": {
-            "rate": 1770,
-            "urgent": 520,
-            "amendment": 0,
-            "performer_rate": 0,
-            "days_handling": "ANY",
-            "performer_handling": "0"
-        },
-        "Exhibiton/product launch +Confrence/forum/seminar/Sumit": {
-            "rate": 1770,
-            "urgent": 520,
-            "amendment": 0,
-            "performer_rate": 0,
-            "days_handling": "ANY",
-            "performer_handling": "0"
-        },
-        "Award Cermony": {
-            "hotel_rate": 2270,  # Includes 1 performer
-            "other_rate": 1570,   # Includes 1 performer
-            "urgent": 500,
-            "amendment": "800+500+750+20" if venue_type.lower() == "hotel" else "800+500+350+20",
-            "performer_rate_hotel": 750,
-            "performer_rate_other": 350,
-            "days_handling": "1",
-            "performer_handling": "1"  # 1 performer included in base rate
-        },
-        "Award Cermony + Confrence": {
-            "hotel_rate": 2790,  # Includes 1 performer
-            "other_rate": 2090,   # Includes 1 performer
-            "urgent": 500,
-            "amendment": "800+500+750+20" if venue_type.lower() == "hotel" else "800+500+350+20",
-            "performer_rate_hotel": 750,
-            "performer_rate_other": 350,
-            "days_handling": "1",
-            "performer_handling": "1"
-        },
-        "Award Cermony+Confrence+Exhibition": {
-            "hotel_rate": 3820,  # Includes 1 performer
-            "other_rate": 3120,   # Includes 1 performer
-            "urgent": 500,
-            "amendment": "800+500+750+20" if venue_type.lower() == "hotel" else "800+500+350+20",
-            "performer_rate_hotel": 750,
-            "performer_rate_other": 350,
-            "days_handling": "1",
-            "performer_handling": "1"
-        },
-        "DJ event": {
-            "hotel_rate": 2270,  # Includes 1 performer
-            "other_rate": 1570,   # Includes 1 performer
-            "urgent": 500,
-            "amendment": "800+500+750+20" if venue_type.lower() == "hotel" else "800+500+350+20",
-            "performer_rate_hotel": 750,
-            "performer_rate_other": 350,
-            "days_handling": "1",
-            "performer_handling": "1"
-        },
-        "Musical event": {
-            "hotel_rate": 2270,  # Includes 1 performer
-            "other_rate": 1570,   # Includes 1 performer
-            "urgent": 500,
-            "amendment": "800+500+750+20" if venue_type.lower() == "hotel" else "800+500+350+20",
-            "performer_rate_hotel": 750,
-            "performer_rate_other": 350,
-            "days_handling": "1",
-            "performer_handling": "1"
-        },
-        "Comedy show": {
-            "hotel_rate": 2270,  # Includes 1 performer
-            "other_rate": 1570,   # Includes 1 performer
-            "urgent": 500,
-            "amendment": "800+500+750+20" if venue_type.lower() == "hotel" else "800+500+350+20",
-            "performer_rate_hotel": 750,
-            "performer_rate_other": 350,
-            "days_handling": "1",
-            "performer_handling": "1"
-        }
-    }
-
     # Normalize venue type
     venue_type_normalized = "hotel" if venue_type.lower() == "hotel" else "other"
 
-    # Try exact match first (case sensitive)
-    matched_type = None
-    for event_key in pricing_data:
-        if event_key == event_type:
-            matched_type = event_key
-            break
-    
-    # If no exact match, try case-insensitive exact match
-    if not matched_type:
-        for event_key in pricing_data:
-            if event_key.lower() == event_type.lower():
-                matched_type = event_key
-                break
+    # Try exact match first (case sensitive), then case-insensitive exact match
+    if event_type in NON_TICKETED_PRICING_DATA:
+        matched_type = event_type
+    else:
+        matched_type = _NON_TICKETED_KEYS_LOWER.get(event_type.lower())
     
     # If still no match, use default
     if not matched_type:
@@ -330,7 +646,10 @@ def calculate_non_ticketed_event_permit_cost(
         logger.warning(f"Could not match event type: {event_type}. Using default.")
 
     # Get pricing info
-    event_pricing = pricing_data[matched_type]
+    event_pricing = NON_TICKETED_PRICING_DATA[matched_type]
+    amendment_rule = event_pricing.get('amendment')
+    if isinstance(amendment_rule, dict):
+        amendment_rule = amendment_rule[venue_type_normalized]
     
     # Initialize cost components
     cost_components = {
@@ -373,36 +692,26 @@ def calculate_non_ticketed_event_permit_cost(
     # Handle amendment fees - dynamic calculation
     if is_amendment:
         # For events with simple amendment fee
-        if isinstance(event_pricing.get('amendment'), (int, float)):
-            cost_components['amendment_fee'] = event_pricing['amendment']
+        if isinstance(amendment_rule, (int, float)):
+            cost_components['amendment_fee'] = amendment_rule
         # For events with complex amendment fee string
-        elif isinstance(event_pricing.get('amendment'), str):
-            try:
-                amendment_parts = [part.strip() for part in event_pricing['amendment'].split('+') if part.strip()]
-                
-                # Calculate dynamic parts
-                dynamic_parts = []
-                for part in amendment_parts:
-                    if part in ['750', '350']:
-                        # Performer rate - calculate based on actual performers
-                        performer_rate = event_pricing[f'performer_rate_{venue_type_normalized}']
-                        dynamic_parts.append(str(additional_performers * performer_rate))
-                    elif part == '800':
-                        # Additional days fee - we've already calculated this separately
-                        dynamic_parts.append(str(cost_components['additional_days_fee']))
-                    else:
-                        dynamic_parts.append(part)
-                
-                # Calculate total amendment fee
-                amendment_fee = sum(int(part) for part in dynamic_parts if part.isdigit())
-                cost_components['amendment_fee'] = amendment_fee
+        elif isinstance(amendment_rule, str):
+            terms = _AMENDMENT_TERMS.get(amendment_rule)
+            if terms is None:
+                logger.warning(f"Could not parse amendment fee: {amendment_rule}")
+                cost_components['amendment_fee'] = 0
+            else:
+                fixed_fee, performer_terms, day_terms = terms
+                # Performer and day terms use the actual counts; days were already calculated above
+                performer_rate = event_pricing[f'performer_rate_{venue_type_normalized}']
+                cost_components['amendment_fee'] = (
+                    fixed_fee
+                    + performer_terms * additional_performers * performer_rate
+                    + day_terms * cost_components['additional_days_fee']
+                )
                 
                 # Amendment includes urgent fee, so don't add it separately
                 is_urgent = False
-                
-            except (ValueError, AttributeError):
-                logger.warning(f"Could not parse amendment fee: {event_pricing['amendment']}")
-                cost_components['amendment_fee'] = 0
     
     # Add urgent fee if needed (only if not already included in amendment)
     if is_urgent and not is_amendment:
@@ -449,7 +758,7 @@ def calculate_non_ticketed_event_permit_cost(
         )
         if is_amendment:
             breakdown['calculation_notes'].append(
-                f"Amendment calculation: {event_pricing.get('amendment', 'N/A')}"
+                f"Amendment calculation: {amendment_rule if amendment_rule is not None else 'N/A'}"
             )
     
     return breakdown
@@ -485,51 +794,23 @@ def calculate_event_permit_cost(
     Calculate the total permit cost for an event based on various parameters.
     Uses the pricing structure from the provided CSV data.
     """
-    # Define the pricing structure from CSV with day handling info
-    pricing_data = {
-        "Exhibition": {"rate": 1270, "urgent": 500, "amendment": "NA", "days_handling": "ANY"},
-        "Conference": {"rate": 1270, "urgent": 500, "amendment": "NA", "days_handling": "ANY"},
-        "Conference + Exhibition": {"rate": 1770, "urgent": 500, "amendment": "NA", "days_handling": "ANY"},
-        "Product Launch/Forum/Seminar/Summit": {"rate": 1270, "urgent": 500, "amendment": "NA", "days_handling": "ANY"},
-        "Exhibition/Product Launch + Conference/Forum/Seminar/Summit": {"rate": 1770, "urgent": 500, "amendment": "NA", "days_handling": "ANY"},
-        "Award Ceremony": {"rate": 1520, "urgent": 500, "amendment": 1320, "days_handling": "1"},
-        "Award Ceremony + Conference": {"rate": 2570, "urgent": 500, "amendment": 1320, "days_handling": "1"},
-        "Award Ceremony + Conference + Exhibition": {"rate": 3070, "urgent": 500, "amendment": 1320, "days_handling": "1"},
-        "DJ Event": {"rate": 1520, "urgent": 500, "amendment": 1320, "days_handling": "1"},
-        "Musical Event": {"rate": 1520, "urgent": 500, "amendment": 1320, "days_handling": "1"},
-        "Comedy Show": {"rate": 1520, "urgent": 500, "amendment": 1320, "days_handling": "1"}
-    }
-
     # First try exact matching (case insensitive)
-    matched_type = None
     normalized_input = event_type.strip().lower()
+    matched_type = _TICKETED_KEYS_LOWER.get(normalized_input)
     
-    # Try exact match first
-    for event_key in pricing_data:
-        if event_key.lower() == normalized_input:
-            matched_type = event_key
-            break
-    
-    # If no exact match, try partial match (but prioritize longer matches)
+    # If no exact match, try partial match (keys are pre-sorted longest first)
     if not matched_type:
-        best_match = None
-        best_length = 0
-        
-        for event_key in pricing_data:
-            if event_key.lower() in normalized_input:
-                # Prefer the longest matching key
-                if len(event_key) > best_length:
-                    best_match = event_key
-                    best_length = len(event_key)
-        
-        matched_type = best_match
+        matched_type = next(
+            (event_key for key_lower, event_key in _TICKETED_KEYS_BY_LENGTH if key_lower in normalized_input),
+            None
+        )
     
     if not matched_type:
         matched_type = "Conference"  # Default fallback
         logger.warning(f"Could not match event type: {event_type}. Using default.")
     
     # Get pricing info
-    event_pricing = pricing_data[matched_type]
+    event_pricing = TICKETED_PRICING_DATA[matched_type]
     base_rate = event_pricing["rate"]
     
     # Initialize cost components
@@ -577,12 +858,12 @@ def calculate_event_permit_cost(
     
     return breakdown
 
-def map_event_data_to_calculator_params(event_data):
+def map_event_data_to_calculator_params(event_data: EventData) -> Dict[str, Any]:
     """
     Map event data from the app to calculator parameters.
     """
     # Extract event types
-    event_types = event_data.get('event_types', [])
+    event_types = event_data.event_types or []
     if isinstance(event_types, str):
         event_types = [event_types]
     
@@ -599,21 +880,21 @@ def map_event_data_to_calculator_params(event_data):
     event_type = event_type_mapping.get(event_type, event_type)
     
     # Determine if ticketed
-    ticketing_type = event_data.get('ticketing_type', 'non_ticketed')
-    is_ticketed = ticketing_type in ['paid_ticketed', 'free_ticketed']
+    ticketing_type = event_data.ticketing_type or 'non_ticketed'
+    is_ticketed = ticketing_type in _TICKETED_TYPES
     
     # Map venue type - ensure it's either 'hotel' or 'other'
-    venue = event_data.get('venue', '').lower()
+    venue = (event_data.venue or '').lower()
     venue_type = 'hotel' if 'hotel' in venue else 'other'
     
     # Get other parameters
-    num_days = event_data.get('no_of_days', 1)
-    num_performers = event_data.get('no_of_performers', 0)
-    num_speakers = event_data.get('no_of_speakers', 0)
+    num_days = event_data.no_of_days or 1
+    num_performers = event_data.no_of_performers or 0
+    num_speakers = event_data.no_of_speakers or 0
     
     # Get urgent/amendment status with defaults
-    is_urgent = event_data.get('is_urgent', False)
-    is_amendment = event_data.get('is_amendment', False)
+    is_urgent = event_data.is_urgent or False
+    is_amendment = event_data.is_amendment or False
     
     return {
         'event_type': event_type,
@@ -627,23 +908,23 @@ def map_event_data_to_calculator_params(event_data):
     }
 
 @handle_exceptions
-def calculate_estimated_fees(event_data: Dict[str, Any]) -> Dict[str, Any]:
+def calculate_estimated_fees(event_data: EventData) -> Dict[str, Any]:
     """Calculate estimated government fees using the new calculation logic"""
     try:
-        logger.debug(f"Calculating fees for event: {event_data.get('event_name', 'Unknown')}")
-        
         # Validate input data
-        if not isinstance(event_data, dict):
-            raise ValueError("Event data must be a dictionary")
+        if not isinstance(event_data, EventData):
+            raise ValueError("Event data must be an EventData instance")
+        
+        logger.debug("Calculating fees for event: %s", event_data.event_name or 'Unknown')
         
         # Map event data to calculator parameters
         params = map_event_data_to_calculator_params(event_data)
         
-        # Calculate fees using the new function
+        # Cheap enough to run directly; current_fee() keeps the result for the session
         result = calculate_event_permit_cost(**params)
         
         logger.info(f"Fee calculation completed: {result['total_cost']} AED")
-        logger.debug(f"Fee breakdown: {result['cost_breakdown']}")
+        logger.debug("Fee breakdown: %s", result['cost_breakdown'])
         
         return result
         
@@ -656,22 +937,56 @@ def calculate_estimated_fees(event_data: Dict[str, Any]) -> Dict[str, Any]:
         st.error("Error calculating fees")
         return {'total_cost': 0, 'cost_breakdown': {}, 'calculation_notes': ["Error calculating fees"]}
 
+def current_fee() -> Optional[Dict[str, Any]]:
+    """Return the fee for the session's event, computing and storing it only when missing"""
+    fee_result = st.session_state.get('last_fee')
+    if fee_result is None:
+        fee_result = calculate_estimated_fees(st.session_state.event_data)
+        # Failures come back as None or an empty breakdown; leave them unstored so the next run retries
+        if fee_result and fee_result['cost_breakdown']:
+            st.session_state.last_fee = fee_result
+    return fee_result
+
+def format_fee_breakdown(fee_result: Dict[str, Any]) -> str:
+    """Render a fee calculation result as the detailed breakdown chat message"""
+    # Only show non-zero items
+    components = "  \n".join(
+        _FMT_FEE_LINE(_FEE_COMPONENT_LABELS.get(key) or key.replace('_', ' ').title(), value)
+        for key, value in fee_result['cost_breakdown'].items()
+        if value > 0
+    )
+    notes = ""
+    if fee_result['calculation_notes']:
+        notes = "\n\n**Notes:**\n" + "".join(f"- {note}\n" for note in fee_result['calculation_notes'])
+    return _FEE_BREAKDOWN_TEMPLATE.format(components=components, total=fee_result['total_cost'], notes=notes)
+
+def format_event_info(event_info: Dict[str, Any], fee_total: Optional[int]) -> str:
+    """Render the sidebar's event summary as a single markdown block"""
+    lines = [
+        f"**{_FIELD_LABELS[key]}:** {_FIELD_FORMATTERS.get(key, str)(value)}"
+        for key, value in event_info.items()
+    ]
+    
+    if fee_total is None:
+        lines.append("**Estimated Fee:** Calculating...")
+    else:
+        lines.append("**Estimated Fee:** " + _FMT_AED(fee_total))
+    return "  \n".join(lines)
+
 # ========================= CHAT FUNCTIONS =========================
 
 @handle_exceptions
 def add_to_chat(message: str, is_bot: bool = True):
     """Add message to chat history with error handling"""
     try:
-        logger.debug(f"Adding chat message: {'Bot' if is_bot else 'User'} - {message[:50]}...")
+        logger.debug("Adding chat message: %s - %.50s...", 'Bot' if is_bot else 'User', message)
         
-        chat_entry = {
-            'message': str(message),
-            'is_bot': bool(is_bot),
-            'timestamp': datetime.now()
-        }
+        # Normalize once on append so every rerun re-emits the stored text as-is
+        chat_entry = ChatEntry(textwrap.dedent(str(message)).strip(), bool(is_bot), time.time_ns())
         
+        # chat_history is a bounded deque, so the oldest message drops off automatically
         st.session_state.chat_history.append(chat_entry)
-        logger.debug(f"Chat history length: {len(st.session_state.chat_history)}")
+        logger.debug("Chat history length: %d", len(st.session_state.chat_history))
         
     except Exception as e:
         logger.error(f"Failed to add chat message: {e}")
@@ -680,16 +995,12 @@ def add_to_chat(message: str, is_bot: bool = True):
 def display_chat_history():
     """Display chat history with error handling"""
     try:
-        logger.debug(f"Displaying {len(st.session_state.chat_history)} chat messages")
+        logger.debug("Displaying %d chat messages", len(st.session_state.chat_history))
         
         for i, chat in enumerate(st.session_state.chat_history):
             try:
-                if chat.get('is_bot', True):
-                    with st.chat_message("assistant"):
-                        st.markdown(chat.get('message', 'Error displaying message'))
-                else:
-                    with st.chat_message("user"):
-                        st.markdown(chat.get('message', 'Error displaying message'))
+                with st.chat_message("assistant" if chat.is_bot else "user"):
+                    st.markdown(chat.message)
             except Exception as e:
                 logger.error(f"Error displaying chat message {i}: {e}")
                 st.error(f"Error displaying message {i}")
@@ -701,43 +1012,49 @@ def display_chat_history():
 # ========================= DATABASE OPERATIONS =========================
 
 @handle_exceptions
-def save_to_mongodb(event_data: Dict[str, Any]) -> Optional[str]:
-    """Save event data to MongoDB with comprehensive error handling"""
+def save_to_mongodb(event_data: EventData, fee_result: Optional[Dict[str, Any]] = None) -> Optional[ObjectId]:
+    """Queue event data for MongoDB; fee_result is recalculated when not supplied"""
     try:
-        logger.info(f"Saving event data: {event_data.get('event_name', 'Unknown')}")
+        logger.info(f"Saving event data: {event_data.event_name or 'Unknown'}")
         
         if not event_data:
             raise ValueError("Event data is empty")
         
-        collection = init_connection()
+        collection = get_collection()
         if collection is None:
             logger.error("No database connection available")
             st.error("Database connection not available")
             return None
         
-        save_data = event_data.copy()
-        save_data['created_at'] = datetime.now()
-        
-        fee_result = calculate_event_permit_cost(**map_event_data_to_calculator_params(event_data))
-        save_data['estimated_fee'] = fee_result['total_cost']
-        save_data['fee_breakdown'] = fee_result['cost_breakdown']
-        save_data['app_version'] = "1.2"  # Updated version
-        
-        required_fields = ['event_name', 'event_classification']
-        for field in required_fields:
-            if field not in save_data or not save_data[field]:
+        # Validate before any document or fee work
+        for field in ('event_name', 'event_classification'):
+            if not getattr(event_data, field):
                 raise ValueError(f"Required field missing: {field}")
         
-        logger.debug("Inserting data into MongoDB")
-        result = collection.insert_one(save_data)
+        if fee_result is None:
+            fee_result = calculate_estimated_fees(event_data)
         
-        if result.inserted_id:
-            logger.info(f"Event saved successfully with ID: {result.inserted_id}")
-            return str(result.inserted_id)
-        else:
-            logger.error("Failed to insert document - no ID returned")
-            st.error("Failed to save event data")
-            return None
+        # to_dict() already returns a fresh dict, so the document is built in one merge
+        save_data = {
+            **event_data.to_dict(),
+            'created_at': datetime.now(timezone.utc),
+            'estimated_fee': fee_result['total_cost'],
+            'fee_breakdown': fee_result['cost_breakdown'],
+            'app_version': "1.2"  # Updated version
+        }
+        
+        # BSON has no date-only type, so dates are stored as midnight datetimes;
+        # empty optional text is left out
+        for date_field in ('start_date', 'end_date'):
+            if save_data.get(date_field):
+                save_data[date_field] = datetime.combine(save_data[date_field], datetime.min.time())
+        if not save_data.get('event_description'):
+            save_data.pop('event_description', None)
+        
+        logger.debug("Queueing data for MongoDB insert")
+        inserted_id = queue_insert(save_data)
+        logger.info(f"Event queued for saving with ID: {inserted_id}")
+        return inserted_id
             
     except pymongo.errors.DuplicateKeyError as e:
         logger.error(f"Duplicate event data: {e}")
@@ -758,255 +1075,298 @@ def save_to_mongodb(event_data: Dict[str, Any]) -> Optional[str]:
 
 # ========================= BUTTON HANDLER =========================
 
+def _set_pending(action: str):
+    """Button callback: record which action the next run should handle"""
+    st.session_state._pending = action
+
+# Greeting buttons
+def _on_fee_calc():
+    logger.info("Fee calculator button clicked")
+    add_to_chat("I'd like to calculate government fees for my event", False)
+    add_to_chat(_CLASSIFICATION_MSG)
+    st.session_state.conversation_step = 'event_classification'
+    st.session_state.show_greeting = False
+
+def _on_requirements():
+    logger.info("Requirements button clicked")
+    add_to_chat("I want to check document requirements", False)
+    add_to_chat(_REQUIREMENTS_MSG)
+
+def _on_specialist():
+    logger.info("Specialist button clicked")
+    add_to_chat("I'd like to speak with a permit specialist", False)
+    add_to_chat(_SPECIALIST_MSG)
+
+def _on_general():
+    logger.info("General questions button clicked")
+    add_to_chat("I have general permit questions", False)
+    add_to_chat(_GENERAL_MSG)
+
+# Event classification buttons
+def _on_internal():
+    logger.info("Internal event selected")
+    add_to_chat("Internal Event - Company/organizational event for employees only", False)
+    add_to_chat(_INTERNAL_MSG)
+    st.session_state.event_data.event_classification = 'internal'
+    st.session_state.last_fee = None
+    st.session_state.conversation_step = 'internal_event_info'
+
+def _on_external():
+    logger.info("External event selected")
+    add_to_chat("External Event - Event with external guests, clients, or public attendance", False)
+    add_to_chat(_TICKETING_MSG)
+    st.session_state.event_data.event_classification = 'external'
+    st.session_state.last_fee = None
+    st.session_state.conversation_step = 'external_ticketing'
+
+# Internal event button
+def _on_calc_internal():
+    logger.info("Calculate internal event fees clicked")
+    add_to_chat("Yes, let's calculate the estimated fees", False)
+    st.session_state.conversation_step = 'collect_event_details'
+
+# Ticketing buttons
+def _select_ticketing(ticketing_type: str, message: str):
+    """Record the ticketing choice and move on to the event details form"""
+    add_to_chat(message, False)
+    st.session_state.event_data.ticketing_type = ticketing_type
+    st.session_state.last_fee = None
+    st.session_state.conversation_step = 'collect_event_details'
+
+def _on_paid_ticketed():
+    logger.info("Paid ticketed selected")
+    _select_ticketing('paid_ticketed', "Paid Ticketed - Admission fees/ticket sales")
+
+def _on_free_ticketed():
+    logger.info("Free ticketed selected")
+    _select_ticketing('free_ticketed', "Free Ticketed - Controlled access with registration")
+
+def _on_non_ticketed():
+    logger.info("Non-ticketed selected")
+    _select_ticketing('non_ticketed', "Non-Ticketed - Open access with no registration")
+
+# Results buttons
+def _on_save_app():
+    logger.info("Save application clicked")
+    # The insert itself runs on the datastore writer thread; only document prep happens here
+    application_id = save_to_mongodb(st.session_state.event_data, current_fee())
+    if application_id:
+        # Short reference: first 4 bytes (the timestamp) of the ObjectId, as hex
+        add_to_chat("✅ Application saved successfully! Reference ID: " + application_id.binary[:4].hex(), True)
+    else:
+        add_to_chat("❌ Failed to save application. Please try again.", True)
+
+def _on_new_calc():
+    logger.info("New calculation clicked")
+    st.session_state.conversation_step = 'greeting'
+    st.session_state.event_data = EventData()
+    st.session_state.last_fee = None
+    st.session_state.show_greeting = True
+    add_to_chat("Let's calculate fees for another event!", False)
+
+def _on_summary():
+    logger.info("Summary clicked")
+    try:
+        # Reuse the result computed on form submit
+        fee_result = current_fee()
+        add_to_chat(format_fee_breakdown(fee_result), True)
+    except Exception as e:
+        logger.error(f"Error generating summary: {e}")
+        add_to_chat("❌ Error generating fee summary. Please try again.", True)
+
+# Button key -> handler; each button's on_click stores its key in st.session_state._pending
+_BUTTON_HANDLERS = {
+    'fee_calc': _on_fee_calc,
+    'requirements': _on_requirements,
+    'specialist': _on_specialist,
+    'general': _on_general,
+    'internal': _on_internal,
+    'external': _on_external,
+    'calc_internal': _on_calc_internal,
+    'paid_ticketed': _on_paid_ticketed,
+    'free_ticketed': _on_free_ticketed,
+    'non_ticketed': _on_non_ticketed,
+    'save_app': _on_save_app,
+    'new_calc': _on_new_calc,
+    'summary': _on_summary,
+}
+
 @handle_exceptions
 def handle_button_clicks() -> bool:
-    """Handle all button clicks with comprehensive error handling"""
+    """Run the handler for the button clicked in the previous interaction, if any"""
     try:
-        logger.debug("Processing button clicks")
-        
-        button_states = {}
-        for key in st.session_state:
-            if key.endswith('_clicked') and st.session_state.get(key):
-                button_states[key] = True
-        
-        if button_states:
-            logger.debug(f"Active button states: {button_states}")
+        action = st.session_state.pop('_pending', None)
+        if action is None:
+            return False
         
-        # Greeting buttons
-        if st.session_state.get('fee_calc_clicked'):
-            logger.info("Fee calculator button clicked")
-            add_to_chat("I'd like to calculate government fees for my event", False)
-            classification_message = """
-            Perfect! I'll guide you through the government fee calculation process.\n
-            **Step 1: Event Classification**
-
-            Is your event:\n
-
-            🏢 **INTERNAL** - Company/organizational event for employees only \n
-            🌍 **EXTERNAL** - Event with external guests, clients, or public attendance \n
-
-            This determines your permit category and fee structure.
-            """
-            add_to_chat(classification_message)
-            st.session_state.conversation_step = 'event_classification'
-            st.session_state.show_greeting = False
-            st.session_state.fee_calc_clicked = False
-            return True
-        
-        if st.session_state.get('requirements_clicked'):
-            logger.info("Requirements button clicked")
-            add_to_chat("I want to check document requirements", False)
-            requirements_message = """
-            **📋 DOCUMENT REQUIREMENTS CHECKER**
-            
-            For Dubai event permits, you'll typically need:
-            
-            **For All Events:**\n
-            ✅ Completed application form \n
-            ✅ Company trade license copy \n
-            ✅ Event concept/description  \n
-            ✅ Venue booking confirmation \n
-            ✅ Event layout/floor plan    \n
-            
-            **For External Events:**\n
-            ✅ Marketing materials/brochures \n
-            ✅ Speaker/performer details \n
-            ✅ Security plan (for large events) \n
-            ✅ Insurance certificate \n
-            
-            **For Paid Events:**\n
-            ✅ Ticketing system details   \n
-            ✅ Revenue projections        \n
-            ✅ Payment processing setup   \n
-            
-            Would you like me to help calculate your fees as well?
-            """
-            add_to_chat(requirements_message)
-            st.session_state.requirements_clicked = False
-            return True
+        logger.debug("Pending button action: %s", action)
+        _BUTTON_HANDLERS[action]()
+        return True
         
-        if st.session_state.get('specialist_clicked'):
-            logger.info("Specialist button clicked")
-            add_to_chat("I'd like to speak with a permit specialist", False)
-            specialist_message = """
-            **📞 SPECIALIST CONSULTATION**
-            
-            Our permit specialists can help with:
-            - Complex event scenarios
-            - Multi-venue events
-            - International performer permits
-            - Expedited processing
-            - Compliance reviews
-            
-            **Contact Information:**
-            📧 Email: permits@dubaievents.gov.ae \n
-            📱 Phone: +971-4-XXX-XXXX \n
-            🕐 Hours: Sunday-Thursday, 8:00 AM - 3:00 PM \n
-            
-            In the meantime, I can help you get started with fee calculations!
-            """
-            add_to_chat(specialist_message)
-            st.session_state.specialist_clicked = False
-            return True
+    except Exception as e:
+        logger.error(f"Error in handle_button_clicks: {e}")
+        st.error("Error processing button click")
+        return False
+
+# ========================= DEBUG PANEL =========================
+
+# st.fragment is stable from Streamlit 1.37; older releases only have the experimental name
+_fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda func: func)
+
+@st.cache_resource(show_spinner=False)
+def app_started_at() -> float:
+    """Monotonic time of the first run in this process; a module global would reset every rerun"""
+    return time.monotonic()
+
+@_fragment
+def debug_log_tools():
+    """Log buttons for the debug panel; as a fragment, clicking them reruns only this block"""
+    if st.button("Clear Logs"):
+        try:
+            with open('logs/dubai_event_app.log', 'w') as f:
+                f.write('')
+            with open('logs/errors.log', 'w') as f:
+                f.write('')
+            st.success("Logs cleared")
+        except Exception as e:
+            st.error(f"Failed to clear logs: {e}")
+    
+    # Show recent logs
+    if st.button("Show Recent Logs"):
+        try:
+            with open('logs/dubai_event_app.log', 'r') as f:
+                lines = f.readlines()
+                recent_logs = lines[-10:] if len(lines) > 10 else lines
+                st.text_area("Recent Logs", '\n'.join(recent_logs), height=200)
+        except Exception as e:
+            st.error(f"Failed to read logs: {e}")
+
+# ========================= EVENT FORM =========================
+
+@_fragment
+def event_details_form():
+    """Event details form; as a fragment, an invalid submit reruns only the form"""
+    with st.form("event_details_form"):
+        st.subheader("📋 Event Information Form")
         
-        if st.session_state.get('general_clicked'):
-            logger.info("General questions button clicked")
-            add_to_chat("I have general permit questions", False)
-            general_message = """
-            **❓ GENERAL PERMIT INFORMATION**
+        try:
+            col1, col2 = st.columns(2)
             
-            **Common Questions:**
+            with col1:
+                event_name = st.text_input("Event Name*", placeholder="Enter your event name")
+                
+                if st.session_state.event_data.ticketing_type in _TICKETED_TYPES:
+                    event_types = st.multiselect("Event Type*", TICKETED_EVENT_TYPES)
+                else:
+                    event_types = st.multiselect("Event Type*", NON_TICKETED_EVENT_TYPES)
+                
+                venue = st.selectbox("Event Venue*", VENUE_CHOICES)
+                industry = st.selectbox("Industry Type*", INDUSTRY_CHOICES)
+                
+                no_of_days = st.number_input("Number of Days*", min_value=1, max_value=30, value=1)
             
-            **Q: How long does permit processing take?** \n
-            A: 5-15 working days depending on event complexity
+            with col2:
+                # Widget bounds and defaults are static, so these cannot fail on user input;
+                # anything unexpected is caught by the form-level handler below
+                no_of_participants = st.number_input("Number of Participants*", min_value=1, max_value=10000, value=50)
+                no_of_performers = st.number_input("Number of Performers", min_value=0, max_value=100, value=0)
+                no_of_speakers = st.number_input("Number of Speakers", min_value=0, max_value=100, value=0)
+                
+                start_date = st.date_input("Event Start Date*", min_value=date.today())
+                end_date = st.date_input("Event End Date*", min_value=start_date)
             
-            **Q: Can I apply for multiple events at once?** \n
-            A: Yes, but each event needs a separate application
+            # Add urgent/amendment options
+            col1, col2 = st.columns(2)
+            with col1:
+                is_urgent = st.checkbox("Urgent Processing (500/520 AED)", value=False)
+            with col2:
+                is_amendment = st.checkbox("Amendment Request (Not applicable for Business events)", value=False)
             
-            **Q: What if my event details change?** \n
-            A: You must notify authorities within 48 hours of changes
+            event_description = st.text_area("Event Description", placeholder="Brief description of your event...")
             
-            **Q: Are there restrictions on event timing?**\n
-            A: Yes, some venues have restrictions during Ramadan and national holidays
+            submitted = st.form_submit_button("💰 Calculate Government Fees", use_container_width=True)
             
-            For more specific questions, please refer to this [Dubai Events FAQ](https://epermits.det.gov.ae/ePermit/FAQDocumentEN.html) or contact our support team.\n
-
-            Let me help you calculate your specific event fees!
-            """
-            add_to_chat(general_message)
-            st.session_state.general_clicked = False
-            return True
-        
-        # Event classification buttons
-        if st.session_state.get('internal_clicked'):
-            logger.info("Internal event selected")
-            add_to_chat("Internal Event - Company/organizational event for employees only", False)
-            internal_message = """
-            **INTERNAL EVENT IDENTIFIED** 🏢
-            Good news! For internal company events:
-            - Your venue handles the permit application
-            - Simplified documentation required
-            - Lower government fees typically apply
-            - Faster processing times
-            **What I can help you with:**
-            - Calculate estimated fees for budgeting
-            - Prepare information for your venue
-            - Ensure compliance requirements are met
-            Let's proceed with fee calculation! I'll need some basic event details.
-            """
-            add_to_chat(internal_message)
-            st.session_state.event_data['event_classification'] = 'internal'
-            st.session_state.conversation_step = 'internal_event_info'
-            st.session_state.internal_clicked = False
-            return True
-        
-        if st.session_state.get('external_clicked'):
-            logger.info("External event selected")
-            add_to_chat("External Event - Event with external guests, clients, or public attendance", False)
-            ticketing_message = """
-            **EXTERNAL EVENT IDENTIFIED** 🌍
-            For external events, I need to understand your ticketing structure: \n
-            💰 **PAID TICKETED** - Admission fees, ticket sales, revenue generation \n
-            🎫 **FREE TICKETED** - No charge but controlled access with registration/badges  \n
-            🆓 **NON-TICKETED** - No charge, no registration, open to public \n
-            This classification significantly impacts your permits and fees.
-            """
-            add_to_chat(ticketing_message)
-            st.session_state.event_data['event_classification'] = 'external'
-            st.session_state.conversation_step = 'external_ticketing'
-            st.session_state.external_clicked = False
-            return True
-        
-        # Internal event button
-        if st.session_state.get('calc_internal_clicked'):
-            logger.info("Calculate internal event fees clicked")
-            add_to_chat("Yes, let's calculate the estimated fees", False)
-            st.session_state.conversation_step = 'collect_event_details'
-            st.session_state.calc_internal_clicked = False
-            return True
-        
-        # Ticketing buttons
-        if st.session_state.get('paid_ticketed_clicked'):
-            logger.info("Paid ticketed selected")
-            add_to_chat("Paid Ticketed - Admission fees/ticket sales", False)
-            st.session_state.event_data['ticketing_type'] = 'paid_ticketed'
-            st.session_state.conversation_step = 'collect_event_details'
-            st.session_state.paid_ticketed_clicked = False
-            return True
-        
-        if st.session_state.get('free_ticketed_clicked'):
-            logger.info("Free ticketed selected")
-            add_to_chat("Free Ticketed - Controlled access with registration", False)
-            st.session_state.event_data['ticketing_type'] = 'free_ticketed'
-            st.session_state.conversation_step = 'collect_event_details'
-            st.session_state.free_ticketed_clicked = False
-            return True
-        
-        if st.session_state.get('non_ticketed_clicked'):
-            logger.info("Non-ticketed selected")
-            add_to_chat("Non-Ticketed - Open access with no registration", False)
-            st.session_state.event_data['ticketing_type'] = 'non_ticketed'
-            st.session_state.conversation_step = 'collect_event_details'
-            st.session_state.non_ticketed_clicked = False
-            return True
-        
-        # Results buttons
-        if st.session_state.get('save_app_clicked'):
-            logger.info("Save application clicked")
-            application_id = save_to_mongodb(st.session_state.event_data)
-            if application_id:
-                add_to_chat("✅ Application saved successfully! Reference ID: " + str(application_id)[:8], True)
-            else:
-                add_to_chat("❌ Failed to save application. Please try again.", True)
-            st.session_state.save_app_clicked = False
-            return True
-        
-        if st.session_state.get('new_calc_clicked'):
-            logger.info("New calculation clicked")
-            st.session_state.conversation_step = 'greeting'
-            st.session_state.event_data = {}
-            st.session_state.show_greeting = True
-            add_to_chat("Let's calculate fees for another event!", False)
-            st.session_state.new_calc_clicked = False
-            return True
-        
-        if st.session_state.get('summary_clicked'):
-            logger.info("Summary clicked")
-            try:
-                fee_result = calculate_estimated_fees(st.session_state.event_data)
-                
-                breakdown = f"""
-                **DETAILED FEE BREAKDOWN** \n
-                """
-                
-                # Add each cost component
-                for key, value in fee_result['cost_breakdown'].items():
-                    if value > 0:  # Only show non-zero items
-                        breakdown += f"{key.replace('_', ' ').title()}: AED {value:,}\n"
-                
-                # Add total
-                breakdown += f"\n**Total: AED {fee_result['total_cost']:,}**"
-                
-                # Add calculation notes if any
-                if fee_result['calculation_notes']:
-                    breakdown += "\n\n**Notes:**\n"
-                    for note in fee_result['calculation_notes']:
-                        breakdown += f"- {note}\n"
+            if submitted:
+                try:
+                    logger.info("Event details form submitted")
+                    
+                    # Text inputs are stripped once and reused for validation and storage
+                    event_name = event_name.strip()
+                    event_description = (event_description or "").strip()
+                    
+                    # Validate required fields
+                    validation_errors = []
+                    
+                    if not event_name:
+                        validation_errors.append("Event name is required")
+                    
+                    if not event_types:
+                        validation_errors.append("Please select at least one event type")
+                    
+                    if venue == _VENUE_PLACEHOLDER:
+                        validation_errors.append("Please select a venue")
+                    
+                    if industry == _INDUSTRY_PLACEHOLDER:
+                        validation_errors.append("Please select an industry")
+                    
+                    if no_of_participants <= 0:
+                        validation_errors.append("Number of participants must be greater than 0")
+                    
+                    if start_date > end_date:
+                        validation_errors.append("End date must be after start date")
+                    
+                    if validation_errors:
+                        logger.warning(f"Form validation errors: {validation_errors}")
+                        # One element listing every problem instead of one st.error each
+                        st.error("\n".join(f"- {error}" for error in validation_errors))
+                    else:
+                        # Store event data
+                        ed = replace(
+                            st.session_state.event_data,
+                            event_name=event_name,
+                            event_types=event_types,
+                            venue=venue,
+                            industry=industry,
+                            no_of_days=no_of_days,
+                            no_of_participants=no_of_participants,
+                            no_of_performers=no_of_performers,
+                            no_of_speakers=no_of_speakers,
+                            start_date=start_date,
+                            end_date=end_date,
+                            is_urgent=is_urgent,
+                            is_amendment=is_amendment,
+                            event_description=event_description
+                        )
+                        st.session_state.event_data = ed
+                        
+                        logger.info(f"Event data stored: {event_name}")
+                        add_to_chat(f"Event Details Submitted: {event_name}", False)
+                        
+                        # Calculate and display fees; current_fee stores only a successful result
+                        st.session_state.last_fee = None
+                        fee_result = current_fee()
+                        fee_message = _FEE_ESTIMATE_TEMPLATE.format(
+                            event_name=event_name,
+                            classification=(ed.event_classification or 'Unknown').title(),
+                            participants=no_of_participants,
+                            days=no_of_days,
+                            total=fee_result['total_cost']
+                        )
+                        add_to_chat(fee_message, True)
+                        
+                        st.session_state.conversation_step = 'show_results'
+                        st.rerun()
                 
-                add_to_chat(breakdown, True)
-            except Exception as e:
-                logger.error(f"Error generating summary: {e}")
-                add_to_chat("❌ Error generating fee summary. Please try again.", True)
-            
-            st.session_state.summary_clicked = False
-            return True
-        
-        return False
+                except ValueError as e:
+                    logger.error(f"Value error in form submission: {e}")
+                    st.error(f"Invalid input: {e}")
+                except Exception as e:
+                    logger.error(f"Unexpected error in form submission: {e}", exc_info=True)
+                    st.error("An unexpected error occurred. Please try again.")
         
-    except Exception as e:
-        logger.error(f"Error in handle_button_clicks: {e}")
-        st.error("Error processing button click")
-        return False
+        except Exception as e:
+            logger.error(f"Error rendering form: {e}", exc_info=True)
+            st.error("Error loading form. Please refresh the page.")
 
 # ========================= MAIN APPLICATION =========================
 
@@ -1022,35 +1382,11 @@ def main():
             page_icon="🎪",
             layout="wide"
         )
+        # Pins the process start time on the first run so the footer uptime is accurate
+        app_started_at()
         
-        # Custom CSS
-        st.markdown("""
-        <style>
-            .stButton>button {
-                width: 100%;
-                padding: 0.5rem;
-                border-radius: 8px;
-                font-weight: bold;
-            }
-            .stChatMessage {
-                padding: 1rem;
-                border-radius: 10px;
-                margin-bottom: 1rem;
-            }
-            .stTextInput>div>div>input, .stTextArea>div>div>textarea {
-                border-radius: 8px;
-            }
-            .stSelectbox>div>div>div {
-                border-radius: 8px;
-            }
-            .debug-info {
-                background-color: #f0f0f0;
-                padding: 10px;
-                border-radius: 5px;
-                margin: 10px 0;
-            }
-        </style>
-        """, unsafe_allow_html=True)
+        # Custom CSS and header
+        st.markdown(_PAGE_CHROME, unsafe_allow_html=True)
         
         # Initialize session state
         init_session_state()
@@ -1060,42 +1396,31 @@ def main():
             st.subheader("🔧 Debug Panel")
             
             # Debug mode toggle
-            debug_mode = st.checkbox("Enable Debug Mode", value=st.session_state.get('debug_mode', False))
+            was_debug = st.session_state.debug_mode
+            debug_mode = st.checkbox("Enable Debug Mode", value=was_debug)
             st.session_state.debug_mode = debug_mode
+            if debug_mode != was_debug:
+                logger.info("Debug logging %s for this session", 'enabled' if debug_mode else 'disabled')
             
             if debug_mode:
-                st.write(f"**Session State Keys:** {len(st.session_state.keys())}")
-                st.write(f"**Chat History:** {len(st.session_state.get('chat_history', []))}")
-                st.write(f"**Current Step:** {st.session_state.get('conversation_step', 'Unknown')}")
-                st.write(f"**Error Count:** {st.session_state.get('error_count', 0)}")
+                # One element instead of one st.write per line
+                st.markdown(
+                    f"**Session State Keys:** {len(st.session_state.keys())}  \n"
+                    f"**Chat History:** {len(st.session_state.chat_history)}  \n"
+                    f"**Current Step:** {st.session_state.conversation_step}  \n"
+                    f"**Error Count:** {st.session_state.error_count}"
+                )
                 
-                if st.button("Clear Logs"):
-                    try:
-                        with open('logs/dubai_event_app.log', 'w') as f:
-                            f.write('')
-                        with open('logs/errors.log', 'w') as f:
-                            f.write('')
-                        st.success("Logs cleared")
-                    except Exception as e:
-                        st.error(f"Failed to clear logs: {e}")
-                
-                # Show recent logs
-                if st.button("Show Recent Logs"):
-                    try:
-                        with open('logs/dubai_event_app.log', 'r') as f:
-                            lines = f.readlines()
-                            recent_logs = lines[-10:] if len(lines) > 10 else lines
-                            st.text_area("Recent Logs", '\n'.join(recent_logs), height=200)
-                    except Exception as e:
-                        st.error(f"Failed to read logs: {e}")
+                debug_log_tools()
+        
+        # Show initial greeting
+        if st.session_state.show_greeting and not st.session_state.chat_history:
+            add_to_chat(_GREETING_MSG)
+            st.session_state.show_greeting = False
         
-        # Header
-        st.markdown("""
-        <div style="text-align: center; padding: 2rem 0; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); border-radius: 10px; margin-bottom: 2rem;">
-            <h1 style="color: white; margin: 0; font-size: 2.5rem;">🎪 Dubai Event Permit Business Support Assistant</h1>
-            <p style="color: white; margin: 0.5rem 0 0 0; font-size: 1.2rem;">Your AI-powered guide for Dubai event permits and fee calculations</p>
-        </div>
-        """, unsafe_allow_html=True)
+        # Handle button clicks before rendering so their messages and step
+        # changes appear in this run without a second st.rerun() pass
+        handle_button_clicks()
         
         # Chat interface
         st.subheader("💬 Chat Assistant")
@@ -1105,249 +1430,78 @@ def main():
         with chat_container:
             display_chat_history()
         
-        # Show initial greeting
-        if st.session_state.get('show_greeting', True) and len(st.session_state.get('chat_history', [])) == 0:
-            greeting_message = """
-            Hello! 👋 Welcome to Dubai Event Permit Business Support Assistant.
-            I'm here to help you with:
-            
-            ✅ Event permit applications in Dubai \n
-            ✅ **Government fee calculations and estimates** \n
-            ✅ Document requirements and checklists \n 
-            ✅ Application timeline planning \n
-            ✅ Regulatory compliance guidance \n
-            
-            Let's get your event permit sorted efficiently! How can I assist you today?
-            """
-            add_to_chat(greeting_message)
-            st.session_state.show_greeting = False
-            st.rerun()
-        
-        # Handle button clicks
-        if handle_button_clicks():
-            st.rerun()
-        
         # Conversation flow
-        if st.session_state.get('conversation_step') == 'greeting':
+        step = st.session_state.conversation_step
+        if step == 'greeting':
             col1, col2, col3, col4 = st.columns(4)
             
             with col1:
-                st.button("🎯 Start Fee Calculator", key="fee_calc", on_click=lambda: setattr(st.session_state, 'fee_calc_clicked', True))
+                st.button("🎯 Start Fee Calculator", key="fee_calc", on_click=_set_pending, args=("fee_calc",))
             
             with col2:
-                st.button("📋 Check Requirements", key="requirements", on_click=lambda: setattr(st.session_state, 'requirements_clicked', True))
+                st.button("📋 Check Requirements", key="requirements", on_click=_set_pending, args=("requirements",))
             
             with col3:
-                st.button("📞 Speak with Specialist", key="specialist", on_click=lambda: setattr(st.session_state, 'specialist_clicked', True))
+                st.button("📞 Speak with Specialist", key="specialist", on_click=_set_pending, args=("specialist",))
             
             with col4:
-                st.button("❓ General Questions", key="general", on_click=lambda: setattr(st.session_state, 'general_clicked', True))
+                st.button("❓ General Questions", key="general", on_click=_set_pending, args=("general",))
         
-        elif st.session_state.get('conversation_step') == 'event_classification':
+        elif step == 'event_classification':
             col1, col2 = st.columns(2)
             
             with col1:
-                st.button("🏢 Internal Event", key="internal", on_click=lambda: setattr(st.session_state, 'internal_clicked', True))
+                st.button("🏢 Internal Event", key="internal", on_click=_set_pending, args=("internal",))
             
             with col2:
-                st.button("🌍 External Event", key="external", on_click=lambda: setattr(st.session_state, 'external_clicked', True))
+                st.button("🌍 External Event", key="external", on_click=_set_pending, args=("external",))
         
-        elif st.session_state.get('conversation_step') == 'internal_event_info':
-            st.button("📊 Calculate Fees for Internal Event", key="calc_internal", on_click=lambda: setattr(st.session_state, 'calc_internal_clicked', True))
+        elif step == 'internal_event_info':
+            st.button("📊 Calculate Fees for Internal Event", key="calc_internal", on_click=_set_pending, args=("calc_internal",))
         
-        elif st.session_state.get('conversation_step') == 'external_ticketing':
+        elif step == 'external_ticketing':
             col1, col2, col3 = st.columns(3)
             
             with col1:
-                st.button("💰 Paid Ticketed", key="paid_ticketed", on_click=lambda: setattr(st.session_state, 'paid_ticketed_clicked', True))
+                st.button("💰 Paid Ticketed", key="paid_ticketed", on_click=_set_pending, args=("paid_ticketed",))
             
             with col2:
-                st.button("🎫 Free Ticketed", key="free_ticketed", on_click=lambda: setattr(st.session_state, 'free_ticketed_clicked', True))
+                st.button("🎫 Free Ticketed", key="free_ticketed", on_click=_set_pending, args=("free_ticketed",))
             
             with col3:
-                st.button("🆓 Non-Ticketed", key="non_ticketed", on_click=lambda: setattr(st.session_state, 'non_ticketed_clicked', True))
+                st.button("🆓 Non-Ticketed", key="non_ticketed", on_click=_set_pending, args=("non_ticketed",))
         
-        elif st.session_state.get('conversation_step') == 'collect_event_details':
-            # Event details form with enhanced error handling
-            with st.form("event_details_form"):
-                st.subheader("📋 Event Information Form")
-                
-                try:
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        event_name = st.text_input("Event Name*", placeholder="Enter your event name")
-                        
-                        try:
-                            if st.session_state.event_data.get('ticketing_type') in ['paid_ticketed', 'free_ticketed']:
-                                event_types = st.multiselect("Event Type*", TICKETED_EVENT_TYPES)
-                            else:
-                                event_types = st.multiselect("Event Type*", NON_TICKETED_EVENT_TYPES)
-                        except Exception as e:
-                            logger.error(f"Error with event types selection: {e}")
-                            event_types = st.multiselect("Event Type*", TICKETED_EVENT_TYPES)
-                        
-                        venue = st.selectbox("Event Venue*", ["Select a venue..."] + DUBAI_VENUES)
-                        industry = st.selectbox("Industry Type*", ["Select industry..."] + INDUSTRIES)
-                        
-                        try:
-                            no_of_days = st.number_input("Number of Days*", min_value=1, max_value=30, value=1)
-                        except Exception as e:
-                            logger.error(f"Error with days input: {e}")
-                            no_of_days = 1
-                    
-                    with col2:
-                        try:
-                            no_of_participants = st.number_input("Number of Participants*", min_value=1, max_value=10000, value=50)
-                            no_of_performers = st.number_input("Number of Performers", min_value=0, max_value=100, value=0)
-                            no_of_speakers = st.number_input("Number of Speakers", min_value=0, max_value=100, value=0)
-                        except Exception as e:
-                            logger.error(f"Error with participant/performer inputs: {e}")
-                            no_of_participants = 50
-                            no_of_performers = 0
-                            no_of_speakers = 0
-                        
-                        try:
-                            start_date = st.date_input("Event Start Date*", min_value=date.today())
-                            end_date = st.date_input("Event End Date*", min_value=start_date)
-                        except Exception as e:
-                            logger.error(f"Error with date inputs: {e}")
-                            start_date = date.today()
-                            end_date = date.today()
-                    
-                    # Add urgent/amendment options
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        is_urgent = st.checkbox("Urgent Processing (500/520 AED)", value=False)
-                    with col2:
-                        is_amendment = st.checkbox("Amendment Request (Not applicable for Business events)", value=False)
-                    
-                    event_description = st.text_area("Event Description", placeholder="Brief description of your event...")
-                    
-                    submitted = st.form_submit_button("💰 Calculate Government Fees", use_container_width=True)
-                    
-                    if submitted:
-                        try:
-                            logger.info("Event details form submitted")
-                            
-                            # Validate required fields
-                            validation_errors = []
-                            
-                            if not event_name or event_name.strip() == "":
-                                validation_errors.append("Event name is required")
-                            
-                            if not event_types:
-                                validation_errors.append("Please select at least one event type")
-                            
-                            if venue == "Select a venue...":
-                                validation_errors.append("Please select a venue")
-                            
-                            if industry == "Select industry...":
-                                validation_errors.append("Please select an industry")
-                            
-                            if no_of_participants <= 0:
-                                validation_errors.append("Number of participants must be greater than 0")
-                            
-                            if start_date > end_date:
-                                validation_errors.append("End date must be after start date")
-                            
-                            if validation_errors:
-                                logger.warning(f"Form validation errors: {validation_errors}")
-                                for error in validation_errors:
-                                    st.error(error)
-                            else:
-                                # Store event data
-                                st.session_state.event_data.update({
-                                    'event_name': event_name.strip(),
-                                    'event_types': event_types,
-                                    'venue': venue,
-                                    'industry': industry,
-                                    'no_of_days': int(no_of_days),
-                                    'no_of_participants': int(no_of_participants),
-                                    'no_of_performers': int(no_of_performers),
-                                    'no_of_speakers': int(no_of_speakers),
-                                    'start_date': start_date.isoformat(),
-                                    'end_date': end_date.isoformat(),
-                                    'is_urgent': is_urgent,
-                                    'is_amendment': is_amendment,
-                                    'event_description': event_description.strip() if event_description else ""
-                                })
-                                
-                                logger.info(f"Event data stored: {event_name}")
-                                add_to_chat(f"Event Details Submitted: {event_name}", False)
-                                
-                                # Calculate and display fees
-                                fee_result = calculate_estimated_fees(st.session_state.event_data)
-                                fee_message = f"""
-                                **💰 ESTIMATED GOVERNMENT FEES**
-                                
-                                Event: **{event_name}**
-                                Classification: **{st.session_state.event_data.get('event_classification', 'Unknown').title()}**
-                                Participants: **{no_of_participants:,}**
-                                Duration: **{no_of_days} day(s)**
-                                
-                                **Estimated Total Fee: AED {fee_result['total_cost']:,}**
-                                
-                                *This is an estimate. Final fees may vary based on additional requirements and government regulations.*
-                                """
-                                add_to_chat(fee_message, True)
-                                
-                                st.session_state.conversation_step = 'show_results'
-                                st.rerun()
-                        
-                        except ValueError as e:
-                            logger.error(f"Value error in form submission: {e}")
-                            st.error(f"Invalid input: {e}")
-                        except Exception as e:
-                            logger.error(f"Unexpected error in form submission: {e}")
-                            st.error("An unexpected error occurred. Please try again.")
-                
-                except Exception as e:
-                    logger.error(f"Error rendering form: {e}")
-                    st.error("Error loading form. Please refresh the page.")
+        elif step == 'collect_event_details':
+            event_details_form()
         
-        elif st.session_state.get('conversation_step') == 'show_results':
+        elif step == 'show_results':
             col1, col2, col3 = st.columns(3)
             
             with col1:
-                st.button("💾 Save Application", key="save_app", on_click=lambda: setattr(st.session_state, 'save_app_clicked', True))
+                st.button("💾 Save Application", key="save_app", on_click=_set_pending, args=("save_app",))
             
             with col2:
-                st.button("🔄 Calculate Another Event", key="new_calc", on_click=lambda: setattr(st.session_state, 'new_calc_clicked', True))
+                st.button("🔄 Calculate Another Event", key="new_calc", on_click=_set_pending, args=("new_calc",))
             
             with col3:
-                st.button("📋 View Summary", key="summary", on_click=lambda: setattr(st.session_state, 'summary_clicked', True))
+                st.button("📋 View Summary", key="summary", on_click=_set_pending, args=("summary",))
         
         # Sidebar with current event info
-        if st.session_state.get('event_data'):
+        if st.session_state.event_data:
             with st.sidebar:
                 st.subheader("📊 Current Event Info")
                 
                 try:
-                    event_info = st.session_state.event_data.copy()
+                    event_info = st.session_state.event_data.to_dict()
                     
-                    # Format and display event information
-                    for key, value in event_info.items():
-                        if key not in ['created_at'] and value is not None:
-                            formatted_key = key.replace('_', ' ').title()
-                            
-                            if isinstance(value, list):
-                                formatted_value = ", ".join(value) if value else "None"
-                            elif isinstance(value, (int, float)):
-                                formatted_value = f"{value:,}" if key in ['no_of_participants', 'no_of_performers', 'no_of_speakers'] else str(value)
-                            else:
-                                formatted_value = str(value)
-                            
-                            st.write(f"**{formatted_key}:** {formatted_value}")
+                    try:
+                        fee_total = current_fee()['total_cost']
+                    except Exception as e:
+                        logger.error(f"Error calculating fee for sidebar: {e}")
+                        fee_total = None
                     
-                    # Show estimated fee if available
-                    if event_info:
-                        try:
-                            fee_result = calculate_estimated_fees(event_info)
-                            st.write(f"**Estimated Fee:** AED {fee_result['total_cost']:,}")
-                        except Exception as e:
-                            logger.error(f"Error calculating fee for sidebar: {e}")
-                            st.write("**Estimated Fee:** Calculating...")
+                    # One element instead of one st.write per field
+                    st.markdown(format_event_info(event_info, fee_total))
                 
                 except Exception as e:
                     logger.error(f"Error displaying event info in sidebar: {e}")
@@ -1357,39 +1511,33 @@ def main():
                 if st.button("🗑️ Clear Current Event", key="clear_event"):
                     try:
                         logger.info("Clearing current event data")
-                        st.session_state.event_data = {}
-                        st.session_state.conversation_step = 'greeting'
-                        st.session_state.chat_history = []
-                        st.session_state.show_greeting = True
+                        for key in _CONVERSATION_KEYS:
+                            st.session_state.pop(key, None)
                         st.rerun()
                     except Exception as e:
                         logger.error(f"Error clearing event data: {e}")
                         st.error("Error clearing event data")
         
         # Footer with system info
-        if st.session_state.get('debug_mode'):
-            st.markdown("---")
-            st.markdown("**System Information:**")
+        if st.session_state.debug_mode:
+            st.markdown("---\n\n**System Information:**")
             col1, col2, col3 = st.columns(3)
             
             with col1:
                 st.write(f"**Python Version:** {sys.version_info.major}.{sys.version_info.minor}")
             
             with col2:
-                try:
-                    import streamlit as st_version
-                    st.write(f"**Streamlit Version:** {st_version.__version__}")
-                except:
-                    st.write("**Streamlit Version:** Unknown")
+                st.write(f"**Streamlit Version:** {getattr(st, '__version__', 'Unknown')}")
             
             with col3:
-                st.write(f"**App Uptime:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+                uptime = timedelta(seconds=int(time.monotonic() - app_started_at()))
+                st.write(f"**App Uptime:** {uptime}")
         
         logger.info("Main application completed successfully")
         
     except Exception as e:
-        logger.critical(f"Critical error in main application: {e}")
-        logger.critical(f"Traceback: {traceback.format_exc()}")
+        # exc_info attaches the traceback to the same record instead of formatting it up front
+        logger.critical(f"Critical error in main application: {e}", exc_info=True)
         
         st.error("A critical error occurred. Please refresh the page.")
         
@@ -1399,10 +1547,9 @@ def main():
         
         try:
             if st.button("🔄 Reset Application"):
-                for key in list(st.session_state.keys()):
-                    del st.session_state[key]
+                st.session_state.clear()
                 st.rerun()
-        except:
+        except Exception:
             pass
 
 # ========================= APPLICATION ENTRY POINT =========================
@@ -1414,7 +1561,6 @@ if __name__ == "__main__":
         logger.info("=" * 50)
         main()
     except Exception as e:
-        logger.critical(f"Failed to start application: {e}")
-        logger.critical(f"Traceback: {traceback.format_exc()}")
+        logger.critical(f"Failed to start application: {e}", exc_info=True)
         print(f"Critical Error: {e}")
         print("Please check the logs for more details.")
\ No newline at end of file
@@ -0,0 +1,226 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+from typing import Any, Dict, List, Optional
+
+import pymongo
+from bson import ObjectId
+from pymongo.collection import Collection
+from pymongo.write_concern import WriteConcern
+
+# Streamlit re-executes app.py on every rerun, so process-wide state lives in
+# this imported module where it survives reruns and is shared across sessions.
+
+logger = logging.getLogger('dubai_event_app')
+
+DATABASE_NAME = "Chatbot"
+COLLECTION_NAME = "event_data"
+
+# Compressors are negotiated in order; zstd and snappy need the pymongo[zstd,snappy]
+# extras from requirements.txt, zlib ships with Python
+WIRE_COMPRESSORS = "zstd,snappy,zlib"
+
+# Saves are not safety-critical (the id is generated client-side and the user
+# can re-save), so the background writer skips the journal fsync but still
+# waits for the primary's ack so failures reach the log. The queue-full
+# fallback runs on the UI thread and does not wait at all.
+BATCH_WRITE_CONCERN = WriteConcern(w=1, j=False)
+UNACKNOWLEDGED = WriteConcern(w=0)
+
+# ========================= DATABASE CONNECTION =========================
+
+_COLL: Optional[Collection] = None
+_COLL_LOCK = threading.Lock()
+
+def _create_collection() -> Collection:
+    """Build the MongoDB client and return the event collection handle"""
+    logger.info("Initializing MongoDB connection")
+    connection_string = os.getenv('MONGODB_URI', "dummy_url")
+
+    if not connection_string:
+        raise ValueError("MongoDB connection string is not set")
+
+    logger.debug("Using connection string: %.20s...", connection_string)
+
+    # One pooled client is shared by every session in the process;
+    # connect=False defers the handshake until the first actual operation.
+    # Each app instance keeps at least (minPoolSize + 2) connections open per
+    # replica-set member (the extra two are monitoring sockets), so budget the
+    # cluster's connection limit as (minPoolSize + 2) x members x instances.
+    client = pymongo.MongoClient(
+        connection_string,
+        serverSelectionTimeoutMS=2000,
+        connectTimeoutMS=2000,
+        socketTimeoutMS=5000,
+        maxPoolSize=50,
+        minPoolSize=5,
+        maxIdleTimeMS=300_000,
+        # Fail fast instead of queueing indefinitely when all 50 are checked out
+        waitQueueTimeoutMS=2000,
+        appname="dubai_permit_bot",
+        compressors=WIRE_COMPRESSORS,
+        retryWrites=True,
+        connect=False
+    )
+    # Registered here, once the client exists, so queued saves are written
+    # before the client is closed
+    atexit.register(_shutdown, client)
+
+    collection = client[DATABASE_NAME][COLLECTION_NAME]
+    logger.info(f"Using collection: {DATABASE_NAME}.{collection.name}")
+    return collection
+
+def get_collection() -> Optional[Collection]:
+    """Return the process-wide collection handle, creating it on first use"""
+    global _COLL
+    if _COLL is None:
+        with _COLL_LOCK:
+            if _COLL is None:
+                try:
+                    _COLL = _create_collection()
+                except Exception as e:
+                    # Leave _COLL unset so the next call retries
+                    logger.error(f"MongoDB initialization failed: {e}")
+                    return None
+    return _COLL
+
+_INDEXES_ENSURED = False
+
+def ensure_indexes(collection: Collection) -> bool:
+    """Create the indexes used by admin and analytics queries; no-op when they already exist"""
+    try:
+        collection.create_index(
+            [('event_classification', pymongo.ASCENDING), ('created_at', pymongo.DESCENDING)],
+            name='class_created_idx',
+            background=True
+        )
+        # Recent-first listings across all classifications
+        collection.create_index([('created_at', pymongo.DESCENDING)], name='created_at_desc_idx', background=True)
+        collection.create_index('estimated_fee', background=True)
+        logger.info("MongoDB indexes ensured")
+        return True
+    except pymongo.errors.OperationFailure as e:
+        logger.warning(f"Could not create MongoDB indexes: {e}")
+        return True
+    except pymongo.errors.PyMongoError as e:
+        # Connectivity problem; try again with the next batch
+        logger.warning(f"Deferred MongoDB index creation: {e}")
+        return False
+
+# ========================= BACKGROUND WRITER =========================
+
+WRITE_QUEUE_SIZE = 1000
+FLUSH_BATCH_SIZE = 50
+# How long interpreter exit waits for the writer to finish its queue
+SHUTDOWN_WAIT_SECONDS = 10
+
+_WRITE_Q: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+_WRITER: Optional[threading.Thread] = None
+_WRITER_LOCK = threading.Lock()
+
+def _collect_batch() -> List[Dict[str, Any]]:
+    """
+    Block for the first document, then take whatever else is already queued.
+    A lone save is written at once; under load, documents that arrive while
+    the previous insert_many is in flight form the next batch.
+    """
+    docs = [_WRITE_Q.get()]
+    while len(docs) < FLUSH_BATCH_SIZE:
+        try:
+            docs.append(_WRITE_Q.get_nowait())
+        except queue.Empty:
+            break
+    return docs
+
+def _insert_batch(collection: Collection, docs: List[Dict[str, Any]]):
+    """Write one batch; documents are fully prepared before they are queued"""
+    collection.with_options(write_concern=BATCH_WRITE_CONCERN).insert_many(
+        docs, ordered=False, bypass_document_validation=True
+    )
+
+def _drain():
+    """Writer loop: flush queued documents with one insert_many per batch"""
+    global _INDEXES_ENSURED
+    while True:
+        docs = _collect_batch()
+        try:
+            collection = get_collection()
+            if collection is None:
+                logger.error(f"No database connection, dropping {len(docs)} queued document(s)")
+                continue
+            # Built here rather than at connect time so the UI thread never waits on it
+            if not _INDEXES_ENSURED:
+                _INDEXES_ENSURED = ensure_indexes(collection)
+            _insert_batch(collection, docs)
+            logger.debug("Flushed %d document(s) to MongoDB", len(docs))
+        except Exception as e:
+            logger.error(f"Background insert of {len(docs)} document(s) failed: {e}")
+        finally:
+            # Lets _wait_for_writer see when a batch taken off the queue is done
+            for _ in docs:
+                _WRITE_Q.task_done()
+
+def _ensure_writer():
+    """Start the background writer thread once per process"""
+    global _WRITER
+    if _WRITER is None or not _WRITER.is_alive():
+        with _WRITER_LOCK:
+            if _WRITER is None or not _WRITER.is_alive():
+                _WRITER = threading.Thread(target=_drain, name="mongo-writer", daemon=True)
+                _WRITER.start()
+
+def _wait_for_writer(timeout: float) -> bool:
+    """Wait until the writer has finished every queued document, including a batch in flight"""
+    if _WRITER is None or not _WRITER.is_alive():
+        return False
+    # Same wait as Queue.join(), which has no timeout
+    with _WRITE_Q.all_tasks_done:
+        return _WRITE_Q.all_tasks_done.wait_for(lambda: not _WRITE_Q.unfinished_tasks, timeout)
+
+def flush_pending():
+    """Synchronously write whatever is still queued"""
+    docs = []
+    while True:
+        try:
+            docs.append(_WRITE_Q.get_nowait())
+        except queue.Empty:
+            break
+    if not docs:
+        return
+    try:
+        collection = get_collection()
+        if collection is None:
+            logger.error(f"No database connection, dropping {len(docs)} queued document(s) at shutdown")
+            return
+        _insert_batch(collection, docs)
+        logger.info(f"Flushed {len(docs)} queued document(s) at shutdown")
+    except Exception as e:
+        logger.error(f"Shutdown flush of {len(docs)} document(s) failed: {e}")
+    finally:
+        for _ in docs:
+            _WRITE_Q.task_done()
+
+def _shutdown(client: pymongo.MongoClient):
+    """Exit hook: let the writer finish, write anything it left behind, then close the client"""
+    if not _wait_for_writer(SHUTDOWN_WAIT_SECONDS):
+        flush_pending()
+    client.close()
+
+def queue_insert(document: Dict[str, Any]) -> ObjectId:
+    """
+    Queue a document for insertion and return its client-generated id
+    without waiting for the server. Falls back to insert_one when the queue is full.
+    """
+    document.setdefault('_id', ObjectId())
+    _ensure_writer()
+    try:
+        _WRITE_Q.put_nowait(document)
+    except queue.Full:
+        logger.warning("Write queue is full, inserting synchronously")
+        collection = get_collection()
+        if collection is None:
+            raise ConnectionError("Database connection not available")
+        collection.with_options(write_concern=UNACKNOWLEDGED).insert_one(document)
+    return document['_id']
@@ -0,0 +1,41 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, List, NamedTuple, Optional
+
+# Streamlit re-executes app.py in a fresh module on every rerun, so classes
+# defined there would be new objects each run. Session state outlives a run,
+# so the types stored in it are defined in this imported module instead.
+
+@dataclass(slots=True)
+class EventData:
+    """Event details collected during the conversation; None marks a field not yet provided"""
+    event_classification: Optional[str] = None
+    ticketing_type: Optional[str] = None
+    event_name: Optional[str] = None
+    event_types: Optional[List[str]] = None
+    venue: Optional[str] = None
+    industry: Optional[str] = None
+    no_of_days: Optional[int] = None
+    no_of_participants: Optional[int] = None
+    no_of_performers: Optional[int] = None
+    no_of_speakers: Optional[int] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    is_urgent: Optional[bool] = None
+    is_amendment: Optional[bool] = None
+    event_description: Optional[str] = None
+
+    def __bool__(self) -> bool:
+        """An event is empty until at least one field has been provided"""
+        return any(getattr(self, name) is not None for name in self.__slots__)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the provided fields as a plain dict, in collection order"""
+        # Shallow read of the slots; asdict() would deep-copy event_types on every call
+        return {name: value for name in self.__slots__ if (value := getattr(self, name)) is not None}
+
+class ChatEntry(NamedTuple):
+    """One chat bubble; a tuple keeps each stored message small"""
+    message: str
+    is_bot: bool
+    ts_ns: int
@@ -0,0 +1,23 @@
+import os
+import shutil
+import sys
+import tempfile
+
+# app.py imports its sibling modules (datastore, models) as top-level names,
+# the same way `streamlit run dubai_permit_bot/app.py` resolves them
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dubai_permit_bot'))
+
+_ORIGINAL_CWD = os.getcwd()
+_LOG_DIR = None
+
+def pytest_configure(config):
+    # Importing app runs setup_logging(), which creates logs/ under the current
+    # directory; run from a scratch directory so the checkout stays clean
+    global _LOG_DIR
+    _LOG_DIR = tempfile.mkdtemp(prefix='dubai_permit_bot-tests-')
+    os.chdir(_LOG_DIR)
+
+def pytest_unconfigure(config):
+    os.chdir(_ORIGINAL_CWD)
+    if _LOG_DIR:
+        shutil.rmtree(_LOG_DIR, ignore_errors=True)
@@ -0,0 +1,38 @@
+import pytest
+import streamlit as st
+
+import app
+from models import EventData
+
+@pytest.fixture(autouse=True)
+def session():
+    st.session_state.event_data = EventData()
+    st.session_state.last_fee = None
+    yield st.session_state
+    del st.session_state.event_data
+    del st.session_state.last_fee
+
+@pytest.mark.parametrize("failed_result", [
+    None,
+    {'total_cost': 0, 'cost_breakdown': {}, 'calculation_notes': ["Error calculating fees"]},
+])
+def test_failed_fee_result_is_not_stored(monkeypatch, failed_result):
+    calls = []
+    monkeypatch.setattr(app, 'calculate_estimated_fees', lambda event_data: calls.append(event_data) or failed_result)
+
+    assert app.current_fee() == failed_result
+    assert st.session_state.last_fee is None
+
+    # The next run retries instead of reusing the failure
+    app.current_fee()
+    assert len(calls) == 2
+
+def test_successful_fee_result_is_stored(monkeypatch):
+    result = {'total_cost': 1270, 'cost_breakdown': {'base_fee': 1270}, 'calculation_notes': []}
+    calls = []
+    monkeypatch.setattr(app, 'calculate_estimated_fees', lambda event_data: calls.append(event_data) or result)
+
+    assert app.current_fee() is result
+    assert app.current_fee() is result
+    assert st.session_state.last_fee is result
+    assert len(calls) == 1
@@ -0,0 +1,134 @@
+import queue
+import threading
+import time
+
+import pytest
+
+import datastore
+
+class FakeCollection:
+    """Stands in for a pymongo Collection; records every write in order"""
+
+    name = 'event_data'
+
+    def __init__(self, events):
+        self.events = events
+        self.fail = False
+        # Cleared to hold the writer inside insert_many
+        self.release = threading.Event()
+        self.release.set()
+
+    def with_options(self, **kwargs):
+        return self
+
+    def insert_many(self, docs, **kwargs):
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("insert failed")
+        self.events.append(('insert_many', len(docs)))
+
+    def insert_one(self, doc, **kwargs):
+        self.events.append(('insert_one', 1))
+
+class FakeClient:
+    def __init__(self, events):
+        self.events = events
+
+    def close(self):
+        self.events.append(('close',))
+
+def _wait_until(condition, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+@pytest.fixture
+def events():
+    return []
+
+@pytest.fixture
+def collection(monkeypatch, events):
+    # A fresh queue and writer per test; writers from earlier tests stay blocked on their own queue
+    fake = FakeCollection(events)
+    monkeypatch.setattr(datastore, '_WRITE_Q', queue.Queue(maxsize=datastore.WRITE_QUEUE_SIZE))
+    monkeypatch.setattr(datastore, '_WRITER', None)
+    monkeypatch.setattr(datastore, '_COLL', fake)
+    monkeypatch.setattr(datastore, '_INDEXES_ENSURED', True)
+    yield fake
+    fake.release.set()
+
+def _inserted(events) -> int:
+    return sum(event[1] for event in events if event[0] == 'insert_many')
+
+def test_lone_document_is_flushed_at_once(collection, events):
+    doc = {'event_name': 'Solo'}
+    doc_id = datastore.queue_insert(doc)
+
+    assert doc_id == doc['_id']
+    assert _wait_until(lambda: events == [('insert_many', 1)], timeout=0.5)
+
+def test_batches_are_capped_at_flush_batch_size(collection, events):
+    collection.release.clear()
+    datastore.queue_insert({'n': -1})
+    # The first document is in flight; everything below piles up behind it
+    assert _wait_until(lambda: datastore._WRITE_Q.empty())
+    for n in range(datastore.FLUSH_BATCH_SIZE + 10):
+        datastore.queue_insert({'n': n})
+    collection.release.set()
+
+    assert _wait_until(lambda: _inserted(events) == datastore.FLUSH_BATCH_SIZE + 11)
+    assert events == [('insert_many', 1), ('insert_many', datastore.FLUSH_BATCH_SIZE), ('insert_many', 10)]
+
+def test_shutdown_waits_for_the_writer_before_closing(collection, events):
+    collection.release.clear()
+    for n in range(120):
+        datastore.queue_insert({'n': n})
+    threading.Timer(0.1, collection.release.set).start()
+
+    datastore._shutdown(FakeClient(events))
+
+    assert _inserted(events) == 120
+    assert events[-1] == ('close',)
+
+def test_shutdown_flushes_the_queue_without_a_writer(collection, events, monkeypatch):
+    monkeypatch.setattr(datastore, '_ensure_writer', lambda: None)
+    for n in range(3):
+        datastore.queue_insert({'n': n})
+
+    datastore._shutdown(FakeClient(events))
+
+    assert events == [('insert_many', 3), ('close',)]
+    assert datastore._WRITE_Q.unfinished_tasks == 0
+
+def test_task_done_is_balanced_when_writer_inserts_fail(collection, events):
+    collection.fail = True
+    for n in range(5):
+        datastore.queue_insert({'n': n})
+
+    assert datastore._wait_for_writer(2)
+    assert datastore._WRITE_Q.unfinished_tasks == 0
+    assert events == []
+
+def test_task_done_is_balanced_when_shutdown_flush_fails(collection, events, monkeypatch):
+    monkeypatch.setattr(datastore, '_ensure_writer', lambda: None)
+    collection.fail = True
+    for n in range(3):
+        datastore.queue_insert({'n': n})
+
+    datastore.flush_pending()
+
+    assert datastore._WRITE_Q.unfinished_tasks == 0
+    assert events == []
+
+def test_full_queue_falls_back_to_a_direct_insert(collection, events, monkeypatch):
+    monkeypatch.setattr(datastore, '_WRITE_Q', queue.Queue(maxsize=1))
+    monkeypatch.setattr(datastore, '_ensure_writer', lambda: None)
+
+    datastore.queue_insert({'n': 0})
+    datastore.queue_insert({'n': 1})
+
+    assert events == [('insert_one', 1)]
+    assert datastore._WRITE_Q.qsize() == 1
@@ -0,0 +1,32 @@
+import pytest
+
+from app import _AMENDMENT_TERMS, _parse_amendment_formula, calculate_event_permit_cost
+
+# Expected totals match the calculator as originally written, before the
+# pricing tables and amendment formulas were precomputed
+@pytest.mark.parametrize("params, total, amendment_fee", [
+    # Ticketed
+    (dict(event_type='Exhibition', is_ticketed=True), 1270, 0),
+    (dict(event_type='Conference', is_ticketed=True, num_days=3, is_urgent=True), 1770, 0),
+    (dict(event_type='DJ Event', is_ticketed=True, num_days=2, num_performers=3, is_amendment=True), 3640, 1320),
+    # Non-ticketed, hotel venue
+    (dict(event_type='Exhibition', is_ticketed=False, venue_type='hotel', is_urgent=True), 1790, 0),
+    (dict(event_type='DJ event', is_ticketed=False, venue_type='hotel', num_days=2, num_performers=3), 4570, 0),
+    (dict(event_type='DJ event', is_ticketed=False, venue_type='hotel', num_days=2, num_performers=3,
+          is_amendment=True), 7390, 2820),
+    # Non-ticketed, other venue
+    (dict(event_type='Musical event', is_ticketed=False, venue_type='other', num_performers=2), 1920, 0),
+    (dict(event_type='Musical event', is_ticketed=False, venue_type='other', num_days=3, num_performers=2,
+          is_urgent=True, is_amendment=True), 5990, 2470),
+    (dict(event_type='Award Cermony', is_ticketed=False, venue_type='other', is_amendment=True), 2090, 520),
+])
+def test_calculate_event_permit_cost(params, total, amendment_fee):
+    result = calculate_event_permit_cost(**params)
+    assert result['total_cost'] == total
+    assert result['cost_breakdown']['amendment_fee'] == amendment_fee
+    assert sum(result['cost_breakdown'].values()) == total
+
+def test_parse_amendment_formula():
+    assert _parse_amendment_formula("800+500+750+20") == (520, 1, 1)
+    assert _parse_amendment_formula("800+500+350+20") == (520, 1, 1)
+    assert set(_AMENDMENT_TERMS) == {"800+500+750+20", "800+500+350+20"}